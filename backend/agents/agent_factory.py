@@ -19,31 +19,24 @@ def create_agents_for_session(agent_configs):
         agents.append(create_agent(cfg['role'], cfg['personality']))
     return agents
 
-# Util: send message to agent via file for simulation
-import json
+# Util: send message to agent via file for simulation.
+# Messages and responses are append-only JSON-lines logs (see transcript_log.py),
+# so each send is one O(1) append instead of rewriting the whole file.
+from .transcript_log import AppendLog
+
+_dir = os.path.dirname(__file__)
+message_log = AppendLog(os.path.join(_dir, "messages.jsonl"), legacy_json=os.path.join(_dir, "messages.json"))
+response_log = AppendLog(os.path.join(_dir, "responses.jsonl"), legacy_json=os.path.join(_dir, "responses.json"))
 
 def send_agent_message(sender, recipient, text):
-    msg_file = os.path.join(os.path.dirname(__file__), "messages.json")
-    messages = []
-    if os.path.exists(msg_file):
-        with open(msg_file, "r") as f:
-            try:
-                messages = json.load(f)
-            except Exception:
-                messages = []
-    messages.append({"sender": sender, "recipient": recipient, "text": text})
-    with open(msg_file, "w") as f:
-        json.dump(messages, f)
+    return message_log.append({"sender": sender, "recipient": recipient, "text": text})
+
+def read_agent_messages(offset=0, limit=None):
+    # Returns (messages, next_offset); pass next_offset back in to tail
+    return message_log.read(offset, limit)
 
 # Util: get agent responses via file for simulation
 
-def get_agent_responses():
-    resp_file = os.path.join(os.path.dirname(__file__), "responses.json")
-    responses = []
-    if os.path.exists(resp_file):
-        with open(resp_file, "r") as f:
-            try:
-                responses = json.load(f)
-            except Exception:
-                responses = []
+def get_agent_responses(offset=0):
+    responses, _ = response_log.read(offset)
     return responses
@@ -0,0 +1,90 @@
+# Non-blocking, batched publisher for agent comments
+import asyncio
+import contextvars
+import os
+import time
+
+from common import http_client
+
+PUBLISH_MAX_BATCH = int(os.getenv("PUBLISH_MAX_BATCH", "50"))
+PUBLISH_FLUSH_SECONDS = float(os.getenv("PUBLISH_FLUSH_SECONDS", "0.1"))
+PUBLISH_MAX_QUEUE = int(os.getenv("PUBLISH_MAX_QUEUE", "1000"))
+
+
+class CommentPublisher:
+    """
+    Queues comments on the agents' event loop and ships them to the
+    backend's bulk endpoint in batches, flushing when a batch is full or
+    PUBLISH_FLUSH_SECONDS after its first comment. The HTTP call runs in a
+    worker thread so the event loop never waits on the backend. The queue
+    is bounded: once it is full, publishers wait (backpressure) instead of
+    growing memory without limit.
+    """
+
+    def __init__(self, url, max_batch=PUBLISH_MAX_BATCH, flush_seconds=PUBLISH_FLUSH_SECONDS, max_queue=PUBLISH_MAX_QUEUE):
+        self.url = url
+        self.max_batch = max_batch
+        self.flush_seconds = flush_seconds
+        self.max_queue = max_queue
+        self._queue = None
+        self._loop = None
+        self._task = None
+
+    def start(self):
+        # Must be called from the running loop (e.g. an agent startup handler)
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        # Started from a fresh context: a task copies the caller's, and the
+        # publisher must not inherit the trace of whichever turn started it
+        self._task = contextvars.Context().run(self._loop.create_task, self._run())
+
+    async def publish(self, comment):
+        self.start()
+        await self._queue.put(comment)
+
+    def publish_threadsafe(self, comment):
+        """
+        For code running in worker threads (asyncio.to_thread). Blocks the
+        calling thread, never the loop, while the queue is full.
+        """
+        if self._loop is None or self._loop.is_closed():
+            # No loop yet (e.g. headless use): fall back to a direct post
+            self._post([comment])
+            return
+        asyncio.run_coroutine_threadsafe(self._queue.put(comment), self._loop).result()
+
+    @property
+    def queued(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await asyncio.to_thread(self._post, batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _post(self, batch):
+        try:
+            http_client.post(self.url, pool="feed", json={"comments": batch}, timeout=http_client.timeout(read=5))
+        except Exception as e:
+            print(f"[WARN] Could not post {len(batch)} agent comments: {e}")
+
+    async def close(self):
+        # Drain whatever is queued before shutdown
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        self._task = None
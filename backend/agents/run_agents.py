@@ -1,22 +1,59 @@
-from uagents import Agent, Bureau, Context, Model, Protocol
+from uagents import Agent, Context, Model
 
-from roles import AGENT_ROLES
+from typing import Literal
 import json
 import os
+import sys
 import asyncio
+import time
+import uuid
 import requests
 from dotenv import load_dotenv
 
+# Shared backend helpers live one level up (backend/common)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import http_client
+from common.governor import get_governor, request_key
+from common.resilience import backoff_delay, hedged_call, retry_call
+from common.tracing import tracer
+from common.metrics import LLM_REQUEST_SECONDS, LLM_FIRST_TOKEN_SECONDS, LLM_TOKENS, LLM_ERRORS, registry, start_metrics_server
+
+from roles import AGENT_ROLES
+from publisher import CommentPublisher
+from runtime import AgentRuntime, agent_name
+from scheduler import FOLLOWUP, USER, TurnRefused, TurnScheduler
+
 
 load_dotenv()
 
 ASI1_API_KEY = os.getenv("ASI1_API_KEY")
+# Point this at bench/stub_llm.py to run without a real key
+ASI1_API_URL = os.getenv("ASI1_API_URL", "https://api.asi1.ai/v1/chat/completions")
 if not ASI1_API_KEY:
-    raise RuntimeError("ASI1_API_KEY is required in your .env file!")
+    print("[WARN] ASI1_API_KEY is not set; LLM calls will fail unless ASI1_API_URL points at a stub")
+# Tries per LLM call for retryable errors (429, 5xx, connection errors, timeouts)
+ASI1_ATTEMPTS = int(os.getenv("ASI1_ATTEMPTS", "3"))
+# Send a second, identical request if the first hasn't answered after this many seconds (0 = off)
+ASI1_HEDGE_AFTER = float(os.getenv("ASI1_HEDGE_AFTER", "0"))
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# Spans are sent to the backend's local collector (/api/traces); empty keeps them in this process
+# (set TRACE_FILE to also write them to a JSON lines file)
+TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "http://127.0.0.1:5000/api/traces")
+tracer.configure(service="agents", collector_url=TRACE_COLLECTOR_URL)
+
+class LLMRequestError(Exception):
+    def __init__(self, status, text):
+        super().__init__(f"Request failed: {status} - {text}")
+        self.status = status
+
+def is_retryable(e):
+    if isinstance(e, LLMRequestError):
+        return e.status in RETRYABLE_STATUSES
+    return isinstance(e, (requests.ConnectionError, requests.Timeout))
 
 class LLM:
     def __init__(self, api_key, model="asi1-mini", temperature=0.7, max_tokens=100):
-        self.url = "https://api.asi1.ai/v1/chat/completions"
+        self.url = ASI1_API_URL
         self.headers = {
             'Content-Type': 'application/json',
             'Accept': 'application/json',
@@ -25,8 +62,17 @@ class LLM:
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.timeout = http_client.timeout(read=float(os.getenv("ASI1_READ_TIMEOUT", "60")))
+        # ASI1_MAX_CONCURRENCY / ASI1_RATE_PER_SEC / ASI1_BURST
+        self.governor = get_governor("asi1")
 
-    def send(self, message):
+    def send(self, message, agent="unknown"):
+        """
+        Identical payloads already in flight share one upstream request;
+        everything else queues for a concurrency slot and rate-limit token.
+        Retryable failures are retried with jittered backoff, and a slow
+        request is hedged after ASI1_HEDGE_AFTER seconds.
+        """
         payload = {
             "model": self.model,
             "messages": [
@@ -36,53 +82,237 @@ class LLM:
             "stream": False,
             "max_tokens": self.max_tokens
         }
+        def attempt():
+            # The slot (and rate-limit wait) is taken before the hedge timer starts
+            data, seconds = hedged_call(lambda: self._post(payload, agent), ASI1_HEDGE_AFTER, self.governor.slot)
+            # Only the winning request of a hedge is counted
+            LLM_REQUEST_SECONDS.observe(seconds, provider="asi1", agent=agent, artifact="chat")
+            usage = data.get("usage") or {}
+            LLM_TOKENS.inc(usage.get("prompt_tokens", 0), provider="asi1", agent=agent, artifact="chat", kind="prompt")
+            LLM_TOKENS.inc(usage.get("completion_tokens", 0), provider="asi1", agent=agent, artifact="chat", kind="completion")
+            return data["choices"][0]["message"]["content"]
+        key = request_key(self.url, payload)
+        with tracer.span("llm.send", agent=agent, model=self.model):
+            return retry_call(lambda: self.governor.share(key, attempt), is_retryable, attempts=ASI1_ATTEMPTS)
 
-        response = requests.post(self.url, headers=self.headers, data=json.dumps(payload))
+    def _post(self, payload, agent):
+        # Returns (response data, seconds on the wire); send() records the success metrics
+        started = time.perf_counter()
+        try:
+            response = http_client.post(self.url, pool="llm", headers=self.headers, data=json.dumps(payload), timeout=self.timeout)
+        except Exception as e:
+            LLM_ERRORS.inc(provider="asi1", agent=agent, artifact="chat", reason=type(e).__name__)
+            raise
         if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
+            return response.json(), time.perf_counter() - started
         else:
-            raise Exception(f"Request failed: {response.status_code} - {response.text}")
+            LLM_ERRORS.inc(provider="asi1", agent=agent, artifact="chat", reason=str(response.status_code))
+            raise LLMRequestError(response.status_code, response.text)
+
+    def stream(self, message, agent="unknown"):
+        """
+        Same request as send() but with "stream": True. Yields content
+        deltas as the server-sent chunks arrive. Retryable failures are
+        retried only until the first delta has been handed out.
+        """
+        for attempt in range(ASI1_ATTEMPTS):
+            received = False
+            try:
+                for delta in self._stream_once(message, agent):
+                    received = True
+                    yield delta
+                return
+            except Exception as e:
+                if received or attempt + 1 >= ASI1_ATTEMPTS or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"[WARN] LLM stream for {agent} failed ({e}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _stream_once(self, message, agent):
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "user", "content": message}
+            ],
+            "temperature": self.temperature,
+            "stream": True,
+            "max_tokens": self.max_tokens
+        }
+        headers = dict(self.headers, Accept='text/event-stream')
+        started = time.perf_counter()
+        # A generator can't hold a span open across yields, so the stream is recorded when it ends
+        span_start = time.time()
+        span_attrs = {"agent": agent, "model": self.model}
+        chunks = 0
+        try:
+            # Streams can't be shared between callers, so they only take a slot
+            with self.governor.slot(), http_client.post(self.url, pool="llm", headers=headers, data=json.dumps(payload), stream=True, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    LLM_ERRORS.inc(provider="asi1", agent=agent, artifact="chat", reason=str(response.status_code))
+                    raise LLMRequestError(response.status_code, response.text)
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        if chunks == 0:
+                            LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started, provider="asi1", agent=agent)
+                            span_attrs["first_token_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                        chunks += 1
+                        yield delta
+        except LLMRequestError as e:
+            tracer.record("llm.stream", span_start, error=f"LLMRequestError: {e}", **span_attrs)
+            raise
+        except Exception as e:
+            LLM_ERRORS.inc(provider="asi1", agent=agent, artifact="chat", reason=type(e).__name__)
+            tracer.record("llm.stream", span_start, error=f"{type(e).__name__}: {e}", **span_attrs)
+            raise
+        tracer.record("llm.stream", span_start, chunks=chunks, **span_attrs)
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, provider="asi1", agent=agent, artifact="chat")
+        # Streamed chunks carry roughly one token each
+        LLM_TOKENS.inc(chunks, provider="asi1", agent=agent, artifact="chat", kind="completion")
 
 llm = LLM(api_key=ASI1_API_KEY)
 
 class Message(Model):
     message: str
+    session_id: str = ""
+    # W3C traceparent of the turn that sent it ("" when untraced)
+    trace: str = ""
+    # Agent-to-agent hops since an agent last answered the user
+    depth: int = 0
 
 class KickoffRequest(Model):
     message: str
+    session_id: str = ""
+    # "chain": each agent answers the previous one; "panel": everyone answers the kickoff at once
+    # (anything else is rejected with a 400 by request validation)
+    mode: Literal["chain", "panel"] = "chain"
+    synthesis: bool = True
+    # Agents for this session as [{"role", "personality"}]; defaults to every AGENT_ROLES entry
+    roster: list[dict] = []
+    trace: str = ""
 
 class KickoffResponse(Model):
     status: str
     detail: str
+    trace_id: str = ""
+
+class AgentMessageRequest(Model):
+    agent: str
+    message: str
+    sender: str = "User"
+    session_id: str = ""
+    trace: str = ""
+
+class AgentMessageResponse(Model):
+    agent: str
+    message: str
+
+class StopRequest(Model):
+    session_id: str = ""
+
+class HealthResponse(Model):
+    status: str
+    address: str
+    agents: list[dict]
 
 # Map agent addresses to names for logging/context
 addressToName = {}
 
-BACKEND_URL = "http://127.0.0.1:5000/api/agent-comment"
+BACKEND_BULK_URL = "http://127.0.0.1:5000/api/agent-comments/bulk"
 
-def post_agent_comment(agent_name, sender, message):
+publisher = CommentPublisher(BACKEND_BULK_URL)
+
+def _comment(agent_name, sender, message, session_id=None, **extra):
     payload = {
         "agent": agent_name,
         "sender": sender,
-        "message": message
+        "message": message,
+        "session_id": session_id or None
     }
-    try:
-        requests.post(BACKEND_URL, json=payload, timeout=5)
-    except Exception as e:
-        print(f"[WARN] Could not post agent comment: {e}")
+    payload.update(extra)
+    trace = tracer.traceparent()
+    if trace:
+        # The backend records the publish delay (queue, batching, request) as a span of this trace
+        payload.update(trace=trace, queued_at=time.time())
+    return payload
+
+def post_agent_comment(agent_name, sender, message, session_id=None, **extra):
+    # Called from worker threads; queues onto the batched publisher
+    publisher.publish_threadsafe(_comment(agent_name, sender, message, session_id, **extra))
+
+async def publish_agent_comment(agent_name, sender, message, session_id=None, **extra):
+    # Called from coroutines; only waits if the publish queue is full
+    await publisher.publish(_comment(agent_name, sender, message, session_id, **extra))
+
+# Stream replies token by token into the feed instead of waiting for the full turn.
+# Off by default: streams only take a governor slot, so they miss single-flight
+# sharing and hedging, which only LLM.send applies.
+LLM_STREAM = os.getenv("LLM_STREAM", "0") == "1"
+# Partial tokens are coalesced so we post a few updates per second, not one per token
+STREAM_FLUSH_SECONDS = float(os.getenv("STREAM_FLUSH_SECONDS", "0.15"))
+
+def generate_reply(agent_name, sender_name, prompt, session_id=None):
+    """
+    Runs one LLM turn and publishes it to the feed. In streaming mode the
+    reply shows up as deltas sharing a stream_id, followed by the full text.
+    Blocking: call through asyncio.to_thread.
+    """
+    with tracer.span("generate_reply", agent=agent_name, stream=LLM_STREAM):
+        return _generate_reply(agent_name, sender_name, prompt, session_id)
+
+def _generate_reply(agent_name, sender_name, prompt, session_id=None):
+    if not LLM_STREAM:
+        reply = llm.send(prompt, agent=agent_name)
+        post_agent_comment(agent_name, sender_name, reply, session_id)
+        return reply
+
+    stream_id = uuid.uuid4().hex
+    parts = []
+    pending = []
+    last_flush = time.monotonic()
+    for delta in llm.stream(prompt, agent=agent_name):
+        parts.append(delta)
+        pending.append(delta)
+        if time.monotonic() - last_flush >= STREAM_FLUSH_SECONDS:
+            post_agent_comment(agent_name, sender_name, "".join(pending), session_id, stream_id=stream_id, partial=True)
+            pending = []
+            last_flush = time.monotonic()
+    reply = "".join(parts)
+    # The final comment carries the whole reply and replaces the streamed deltas
+    post_agent_comment(agent_name, sender_name, reply, session_id, stream_id=stream_id, partial=False)
+    return reply
+
+# Max agents answering at the same time in panel mode
+PANEL_CONCURRENCY = int(os.getenv("PANEL_CONCURRENCY", "6"))
+# Role that closes a panel round by synthesizing everyone's opinions
+SYNTHESIS_ROLE = os.getenv("SYNTHESIS_ROLE", "CEO")
 
 # Shared state for kickoff/interjection
 latest_user_message = {"text": None}
 
-# Agent creation using uAgents-native approach
-def make_agent(role, personality, idx):
+# Every LLM turn goes through here: user turns first, follow-ups within each session's budgets
+scheduler = TurnScheduler()
+
+async def take_turn(agent_name, sender_name, prompt, session_id="", priority=USER, depth=0, enforce=True):
+    return await scheduler.run(
+        session_id,
+        lambda: asyncio.to_thread(generate_reply, agent_name, sender_name, prompt, session_id),
+        prompt=prompt, priority=priority, depth=depth, enforce=enforce,
+    )
+
+# Agent creation using uAgents-native approach. Agents don't get their own
+# port: the runtime hosts them all in one Bureau and builds them on demand.
+def make_agent(role, personality):
     agent = Agent(
-        name=f"{role}-{personality}",
-        port=8000 + idx,
-        endpoint=f"http://127.0.0.1:{8000 + idx}",
-        seed=f"{role}-seed",
-        mailbox=True,
-        readme_path="pmreadme.md"
+        name=agent_name(role, personality),
+        seed=f"{role}-{personality}-seed",
     )
 
     @agent.on_event("startup")
@@ -92,61 +322,206 @@ def make_agent(role, personality, idx):
 
     @agent.on_message(model=Message)
     async def handle_message(ctx: Context, sender: str, msg: Message):
+        # Each hop is a span of the trace the message carries (none for untraced messages)
+        with tracer.span("handle_message", parent=msg.trace or None, agent=ctx.agent.name, sender=addressToName.get(sender, sender)):
+            await _handle_message(ctx, sender, msg)
+
+    async def _handle_message(ctx: Context, sender: str, msg: Message):
         sender_name = addressToName.get(sender, sender)
         ctx.logger.info(f"received: '{msg.message}' from {sender_name}")
         llmString = f"{sender_name} says: {msg.message}. Respond as {ctx.agent.name}"
-        llm_response = await asyncio.to_thread(llm.send, llmString)
-
-        await ctx.send(sender, Message(message=llm_response))
-        # Post every agent reply to the backend
-        post_agent_comment(ctx.agent.name, sender_name, llm_response)
-        # Optionally, forward to next agent for roundtable
-        idx = [a.name for a in agents].index(agent.name)
-        next_idx = (idx + 1) % len(agents)
-        next_agent = agents[next_idx]
-        if next_agent.name != sender:
-            await ctx.send(next_agent.address, Message(message=f"Follow-up from {agent.name}: {llm_response}"))
-            post_agent_comment(ctx.agent.name, next_agent.name, f"Follow-up from {agent.name}: {llm_response}")
-
-    # Only add the kickoff endpoint to the first agent (PM-neutral)
-    if role == "PM" and personality == "neutral":
-        @agent.on_rest_post("/start_roundtable", KickoffRequest, KickoffResponse)
-        async def handle_kickoff(ctx: Context, req: KickoffRequest) -> KickoffResponse:
-            latest_user_message["text"] = req.message
-            ctx.logger.info(f"User kickoff/interject: {req.message}")
-            # Start the roundtable
-            await start_roundtable(ctx, req.message)
-            return KickoffResponse(status="ok", detail="Roundtable started")
-
-        async def start_roundtable(ctx: Context, kickoff_message: str):
-            # Start with the kickoff message and pass through all agents
-            msg = kickoff_message
-            sender_name = "User"
-            for i, ag in enumerate(agents):
-                if ag.name == ctx.agent.name:
-                    # This agent is the starter (PM-neutral)
-                    pass
-                else:
-                    # Wait 5 second between each agent
-                    print("FFDGFDGF")
-                llmString = f"{sender_name} says: {msg}. Respond as {ag.name}"
-                # await asyncio.sleep(5)
-                llm_response = await asyncio.to_thread(llm.send, llmString)
-                post_agent_comment(ag.name, sender_name, llm_response)
-                sender_name = ag.name
-                msg = llm_response
+        # Every agent reply is posted to the backend (streamed when LLM_STREAM is on).
+        # Follow-ups queue behind user turns and stop at the session's budgets.
+        try:
+            llm_response = await take_turn(ctx.agent.name, sender_name, llmString, msg.session_id, FOLLOWUP, msg.depth)
+        except TurnRefused as e:
+            ctx.logger.info(f"Not answering {sender_name}: {e}")
+            return
+
+        depth = msg.depth + 1
+        if scheduler.refusal(msg.session_id, FOLLOWUP, depth):
+            # Nobody would answer a further hop, so don't send (or publish) one
+            return
+        await ctx.send(sender, Message(message=llm_response, session_id=msg.session_id, trace=tracer.traceparent(), depth=depth))
+        # Optionally, forward to next agent in this session's roster
+        roster = runtime.roster(session_id=msg.session_id)
+        names = [a.name for a in roster]
+        if agent.name not in names:
+            return
+        next_agent = roster[(names.index(agent.name) + 1) % len(roster)]
+        if next_agent.address != sender:
+            await ctx.send(next_agent.address, Message(message=f"Follow-up from {agent.name}: {llm_response}", session_id=msg.session_id, trace=tracer.traceparent(), depth=depth))
+            await publish_agent_comment(ctx.agent.name, next_agent.name, f"Follow-up from {agent.name}: {llm_response}", msg.session_id)
 
     return agent
 
-# Create all agents
-agents = [make_agent(cfg["role"], cfg["default_personality"], i) for i, cfg in enumerate(AGENT_ROLES)]
 
-# bureau = Bureau()
-# for agent in agents:
-#     bureau.add(agent)
+DEFAULT_ROSTER = [{"role": cfg["role"], "personality": cfg["default_personality"]} for cfg in AGENT_ROLES]
+
+runtime = AgentRuntime(make_agent, DEFAULT_ROSTER)
+
+# The host agent owns the REST endpoints and is the only agent created at startup
+host = Agent(
+    name="Roundtable-host",
+    seed=os.getenv("HOST_AGENT_SEED", "roundtable-host-seed"),
+    readme_path="pmreadme.md"
+)
+
+
+@host.on_event("startup")
+async def host_startup(ctx: Context):
+    publisher.start()
+
+
+@host.on_event("shutdown")
+async def host_shutdown(ctx: Context):
+    await publisher.close()
+
+
+# Where the backend reaches this runtime; set it when running several replicas
+AGENTS_PUBLIC_URL = os.getenv("AGENTS_PUBLIC_URL", f"http://127.0.0.1:{runtime.port}")
+AGENT_REGISTRY_URL = os.getenv("AGENT_REGISTRY_URL", "http://127.0.0.1:5000/api/agents/register")
+# Turns each agent in this runtime should be given at the same time
+AGENT_CAPACITY = int(os.getenv("AGENT_CAPACITY", "4"))
+AGENT_HEARTBEAT_SECONDS = float(os.getenv("AGENT_HEARTBEAT_SECONDS", "15"))
+
+def hosted_agents():
+    return [dict(c, capacity=AGENT_CAPACITY, default=c in DEFAULT_ROSTER) for c in runtime.hosted()]
+
+
+@host.on_rest_get("/health", HealthResponse)
+async def handle_health(ctx: Context) -> HealthResponse:
+    return HealthResponse(status="ok", address=AGENTS_PUBLIC_URL, agents=hosted_agents())
+
+
+@host.on_interval(period=AGENT_HEARTBEAT_SECONDS)
+async def register_agents(ctx: Context):
+    # Re-registering on every beat keeps the backend's registry entries fresh
+    payload = {"address": AGENTS_PUBLIC_URL, "agents": hosted_agents()}
+    try:
+        await asyncio.to_thread(http_client.post, AGENT_REGISTRY_URL, pool="feed", json=payload, timeout=http_client.timeout(read=5))
+    except Exception as e:
+        ctx.logger.warning(f"Agent registration failed: {e}")
+
+
+@host.on_rest_post("/start_roundtable", KickoffRequest, KickoffResponse)
+async def handle_kickoff(ctx: Context, req: KickoffRequest) -> KickoffResponse:
+    latest_user_message["text"] = req.message
+    ctx.logger.info(f"User kickoff/interject: {req.message}")
+    # The user speaking again lifts a stop and starts a new turn count; token and cost budgets still apply
+    scheduler.resume(req.session_id)
+    refused = scheduler.refusal(req.session_id, USER)
+    if refused:
+        return KickoffResponse(status="refused", detail=refused)
+    roster = runtime.roster(req.roster, req.session_id)
+    # A kickoff starts a trace unless the caller passed its own traceparent
+    with tracer.span("start_roundtable", parent=req.trace or None, root=True, mode=req.mode, session_id=req.session_id) as span:
+        trace_id = span.trace_id if span else ""
+        # Start the roundtable
+        if req.mode == "panel":
+            refused = await start_panel(ctx, roster, req.message, req.session_id, req.synthesis)
+            detail = "Panel started"
+        else:
+            refused = await start_roundtable(ctx, roster, req.message, req.session_id)
+            detail = "Roundtable started"
+        if refused:
+            return KickoffResponse(status="refused", detail=refused, trace_id=trace_id)
+        return KickoffResponse(status="ok", detail=detail, trace_id=trace_id)
+
+
+@host.on_rest_post("/agent_message", AgentMessageRequest, AgentMessageResponse)
+async def handle_agent_message(ctx: Context, req: AgentMessageRequest) -> AgentMessageResponse:
+    # One turn for one agent, used by the backend's /api/agent-message roundtable
+    roster = runtime.roster(session_id=req.session_id)
+    ag = next((a for a in roster if a.name == req.agent), None)
+    if ag is None:
+        role, _, personality = req.agent.partition("-")
+        ag = runtime.get_agent(role, personality or "neutral")
+    llmString = f"{req.sender} says: {req.message}. Respond as {ag.name}"
+    # The backend's roundtable is already bounded by its roster: queued as a user turn and charged, never refused
+    with tracer.span("agent_message", parent=req.trace or None, agent=ag.name):
+        reply = await take_turn(ag.name, req.sender, llmString, req.session_id, enforce=False)
+    return AgentMessageResponse(agent=ag.name, message=reply)
+
+
+@host.on_rest_post("/stop_roundtable", StopRequest, KickoffResponse)
+async def handle_stop(ctx: Context, req: StopRequest) -> KickoffResponse:
+    # Ends the session's agent-to-agent follow-ups until the user speaks again
+    scheduler.stop(req.session_id)
+    budget = scheduler.budget(req.session_id)
+    return KickoffResponse(status="ok", detail=f"Stopped after {budget.turns} turns, ~{budget.tokens} tokens")
+
+
+async def start_roundtable(ctx: Context, roster, kickoff_message: str, session_id: str = ""):
+    # Start with the kickoff message and pass through all agents.
+    # Returns the refusal reason if the session's budget refused the first turn.
+    msg = kickoff_message
+    sender_name = "User"
+    for ag in roster:
+        llmString = f"{sender_name} says: {msg}. Respond as {ag.name}"
+        try:
+            with tracer.span("agent_turn", agent=ag.name):
+                llm_response = await take_turn(ag.name, sender_name, llmString, session_id)
+        except TurnRefused as e:
+            ctx.logger.info(f"Roundtable ended early: {e}")
+            return e.reason if sender_name == "User" else None
+        except Exception as e:
+            # Skip the agent; the next one answers the last good message
+            print(f"[WARN] {ag.name} failed in roundtable: {e}")
+            continue
+        sender_name = ag.name
+        msg = llm_response
+
+
+async def start_panel(ctx: Context, roster, kickoff_message: str, session_id: str = "", synthesis: bool = True):
+    # Every agent answers the kickoff independently, so the first full
+    # round takes about one LLM round-trip instead of one per agent.
+    # Returns the refusal reason if the session's budget refused every answer.
+    semaphore = asyncio.Semaphore(PANEL_CONCURRENCY)
+
+    async def answer(ag):
+        async with semaphore:
+            llmString = f"User says: {kickoff_message}. Respond as {ag.name}"
+            return await take_turn(ag.name, "User", llmString, session_id)
+
+    replies = await asyncio.gather(*[answer(ag) for ag in roster], return_exceptions=True)
+    opinions = [(ag.name, r) for ag, r in zip(roster, replies) if not isinstance(r, Exception)]
+    for ag, r in zip(roster, replies):
+        if isinstance(r, Exception):
+            ctx.logger.warning(f"{ag.name} failed in panel: {r}")
+    if replies and all(isinstance(r, TurnRefused) for r in replies):
+        return replies[0].reason
+    if not synthesis or not opinions:
+        return None
+
+    synthesizer = next((ag for ag in roster if ag.name.startswith(f"{SYNTHESIS_ROLE}-")), roster[0])
+    panel_text = "\n".join(f"{name}: {reply}" for name, reply in opinions)
+    llmString = (
+        f"User says: {kickoff_message}. The team answered:\n{panel_text}\n"
+        f"Respond as {synthesizer.name}: synthesize these views into a decision and next steps"
+    )
+    try:
+        await take_turn(synthesizer.name, "Panel", llmString, session_id)
+    except TurnRefused as e:
+        ctx.logger.info(f"Panel synthesis skipped: {e}")
+    except Exception as e:
+        # The panel's answers are already posted; a failed synthesis doesn't fail the kickoff
+        ctx.logger.warning(f"{synthesizer.name} failed in panel synthesis: {e}")
+
+
+# Added after its REST handlers are declared: the Bureau copies them at add time
+runtime.add(host)
 
-async def run_agents():
-    await asyncio.gather(*[agent.run_async() for agent in agents])
+# The Bureau only serves JSON models, so Prometheus metrics get their own small server
+AGENTS_METRICS_PORT = int(os.getenv("AGENTS_METRICS_PORT", "8100"))
+registry.gauge("agents_runtime_agents", "Agents instantiated in this runtime", fn=lambda: {(): runtime.agent_count})
+registry.gauge("agents_publish_queue", "Comments waiting to be published", fn=lambda: {(): publisher.queued})
+registry.gauge("agents_turns_running", "Agent LLM turns running", fn=lambda: {(): scheduler.running})
+registry.gauge("agents_turns_queued", "Agent LLM turns waiting for a slot", ("priority",),
+               fn=lambda: {("user",): scheduler.queued(USER), ("followup",): scheduler.queued(FOLLOWUP)})
+registry.gauge("agents_turns", "Agent LLM turns by outcome", ("outcome",),
+               fn=lambda: {(k,): v for k, v in scheduler.stats.items()})
 
 if __name__ == "__main__":
-    asyncio.run(run_agents())
+    start_metrics_server(AGENTS_METRICS_PORT)
+    runtime.run()
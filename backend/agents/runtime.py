@@ -0,0 +1,96 @@
+# Single-process host for every agent role, with agents created on demand
+from collections import OrderedDict
+from threading import Lock
+import os
+
+from uagents import Bureau
+
+AGENTS_RUNTIME_PORT = int(os.getenv("AGENTS_RUNTIME_PORT", "8000"))
+# Rosters remembered per session so follow-ups go to the session's own agents
+MAX_SESSION_ROSTERS = int(os.getenv("MAX_SESSION_ROSTERS", "500"))
+
+
+def agent_name(role, personality):
+    return f"{role}-{personality}"
+
+
+class AgentRuntime:
+    """
+    Hosts all agents in one Bureau behind a single port. An agent is only
+    built (by the factory) the first time a roster asks for its
+    role/personality, and is then shared by every roster that uses it.
+    """
+
+    def __init__(self, factory, default_roster, port=AGENTS_RUNTIME_PORT):
+        self.factory = factory
+        self.default_roster = default_roster
+        self.port = port
+        self.bureau = Bureau(port=port, endpoint=[f"http://127.0.0.1:{port}/submit"])
+        self._agents = {}
+        self._built = {}
+        self._rosters = OrderedDict()
+        self._lock = Lock()
+        self._running = False
+
+    def add(self, agent):
+        # For agents that must exist from the start (e.g. the REST host)
+        self.bureau.add(agent)
+        self._agents[agent.name] = agent
+        return agent
+
+    def get_agent(self, role, personality):
+        name = agent_name(role, personality)
+        with self._lock:
+            agent = self._agents.get(name)
+            if agent is None:
+                agent = self.factory(role, personality)
+                self.bureau.add(agent)
+                self._built[name] = {"role": role, "personality": personality}
+                if self._running:
+                    # The bureau is already serving: start this agent's handlers now
+                    agent.setup()
+                self._agents[name] = agent
+            return agent
+
+    def roster(self, configs=None, session_id=None):
+        """
+        Returns the agents for a roster (list of {'role', 'personality'}),
+        creating any that don't exist yet. Without configs, reuses the
+        session's last roster or falls back to the default one.
+        """
+        if not configs:
+            with self._lock:
+                configs = self._rosters.get(session_id) if session_id else None
+            configs = configs or self.default_roster
+        agents = [self.get_agent(c["role"], c["personality"]) for c in configs]
+        if session_id:
+            with self._lock:
+                self._rosters[session_id] = configs
+                self._rosters.move_to_end(session_id)
+                while len(self._rosters) > MAX_SESSION_ROSTERS:
+                    self._rosters.popitem(last=False)
+        return agents
+
+    def hosted(self):
+        # Role/personality of every agent this runtime serves without extra setup
+        with self._lock:
+            built = list(self._built.values())
+        configs = list(self.default_roster)
+        return configs + [c for c in built if c not in configs]
+
+    def find(self, name):
+        with self._lock:
+            return self._agents.get(name)
+
+    @property
+    def agent_count(self):
+        with self._lock:
+            return len(self._agents)
+
+    def run(self):
+        # Blocks; the Bureau drives its own event loop
+        self._running = True
+        try:
+            self.bureau.run()
+        finally:
+            self._running = False
@@ -0,0 +1,166 @@
+# Turn scheduling for agent LLM calls: per-session budgets, a stop condition and a priority queue
+from collections import OrderedDict
+import asyncio
+import heapq
+import itertools
+import os
+
+from summarizer.compaction import estimate_tokens
+
+# Agent turns (LLM calls) running at the same time across all sessions
+TURN_CONCURRENCY = int(os.getenv("TURN_CONCURRENCY", "8"))
+# Turns a session may take per user message (kickoff); starts over when the user speaks again (0 = no limit)
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "60"))
+# Per-session spend limits; once one is reached the session takes no more turns (0 = no limit)
+SESSION_MAX_TOKENS = int(os.getenv("SESSION_MAX_TOKENS", "60000"))
+SESSION_MAX_COST = float(os.getenv("SESSION_MAX_COST", "0"))
+# Price used for SESSION_MAX_COST, in the same currency, per 1000 prompt + completion tokens
+ASI1_COST_PER_1K_TOKENS = float(os.getenv("ASI1_COST_PER_1K_TOKENS", "0"))
+# Agent-to-agent follow-ups allowed after an agent answered the user before the chain stops
+MAX_FOLLOWUP_DEPTH = int(os.getenv("MAX_FOLLOWUP_DEPTH", "5"))
+MAX_SCHEDULED_SESSIONS = int(os.getenv("MAX_SCHEDULED_SESSIONS", "1000"))
+
+# Queue priorities: lower runs first
+USER, FOLLOWUP = 0, 1
+
+
+class TurnRefused(Exception):
+    def __init__(self, session_id, reason):
+        super().__init__(f"session {session_id or 'default'}: {reason}")
+        self.reason = reason
+
+
+class SessionBudget:
+    def __init__(self):
+        self.turns = 0        # since the user last spoke
+        self.tokens = 0
+        self.cost = 0.0
+        # Set by stop(); cleared when the user speaks again
+        self.stopped = False
+
+    def exhausted(self):
+        if SESSION_MAX_TURNS and self.turns >= SESSION_MAX_TURNS:
+            return "turn budget reached"
+        if SESSION_MAX_TOKENS and self.tokens >= SESSION_MAX_TOKENS:
+            return "token budget reached"
+        if SESSION_MAX_COST and self.cost >= SESSION_MAX_COST:
+            return "cost budget reached"
+        return None
+
+    def charge(self, tokens):
+        self.tokens += tokens
+        self.cost += tokens / 1000 * ASI1_COST_PER_1K_TOKENS
+
+
+class TurnScheduler:
+    """
+    Every agent turn waits here for one of `concurrency` slots. Waiting
+    turns are served by priority, so turns answering the user (kickoffs,
+    interjections) go ahead of queued agent-to-agent follow-ups, and FIFO
+    within a priority.
+
+    Each session has a token and cost budget, and a turn budget per user
+    message (reset by resume()). Follow-ups also stop
+    MAX_FOLLOWUP_DEPTH hops after the user's message, or as soon as the
+    session is stopped, so one message can no longer set off an endless
+    chain. Budgets are checked when a turn is submitted and again when it
+    gets its slot. Runs on the agents' event loop only, so needs no locks.
+    """
+
+    def __init__(self, concurrency=TURN_CONCURRENCY, max_depth=MAX_FOLLOWUP_DEPTH, max_sessions=MAX_SCHEDULED_SESSIONS):
+        self.concurrency = concurrency
+        self.max_depth = max_depth
+        self.max_sessions = max_sessions
+        self._budgets = OrderedDict()
+        self._waiting = []    # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._running = 0
+        self.stats = {"run": 0, "refused": 0}
+
+    def budget(self, session_id):
+        key = session_id or ""
+        budget = self._budgets.get(key)
+        if budget is None:
+            budget = self._budgets[key] = SessionBudget()
+            # Least recently active sessions are forgotten first (their budget starts over)
+            while len(self._budgets) > self.max_sessions:
+                self._budgets.popitem(last=False)
+        self._budgets.move_to_end(key)
+        return budget
+
+    def refusal(self, session_id, priority=FOLLOWUP, depth=0):
+        """Why the session may not take this turn, or None if it may."""
+        budget = self.budget(session_id)
+        if priority == FOLLOWUP:
+            if budget.stopped:
+                return "stopped"
+            if depth > self.max_depth:
+                return "follow-up depth reached"
+        return budget.exhausted()
+
+    def stop(self, session_id):
+        # Queued follow-ups of the session are dropped when their slot comes up
+        self.budget(session_id).stopped = True
+
+    def resume(self, session_id):
+        # The user spoke: lifts a stop and starts a new turn count
+        budget = self.budget(session_id)
+        budget.stopped = False
+        budget.turns = 0
+
+    async def run(self, session_id, turn, prompt="", priority=FOLLOWUP, depth=0, enforce=True):
+        """
+        Awaits turn() (a coroutine function returning the reply) once a slot
+        is free and charges the session for it. Raises TurnRefused when the
+        session's budgets or stop condition don't allow the turn; with
+        enforce=False the turn is only queued and charged.
+        """
+        self._check(session_id, priority, depth, enforce)
+        await self._acquire(priority)
+        try:
+            # The session may have used up its budget or been stopped while this turn queued
+            self._check(session_id, priority, depth, enforce)
+            budget = self.budget(session_id)
+            budget.turns += 1
+            self.stats["run"] += 1
+            reply = await turn()
+            budget.charge(estimate_tokens(prompt) + estimate_tokens(reply or ""))
+            return reply
+        finally:
+            self._release()
+
+    def _check(self, session_id, priority, depth, enforce):
+        reason = self.refusal(session_id, priority, depth) if enforce else None
+        if reason:
+            self.stats["refused"] += 1
+            raise TurnRefused(session_id, reason)
+
+    async def _acquire(self, priority):
+        if self._running < self.concurrency and not self._waiting:
+            self._running += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancel: pass it on
+                self._release()
+            raise
+
+    def _release(self):
+        # Hands the slot straight to the best waiter, so _running stays the same
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._running -= 1
+
+    def queued(self, priority):
+        return sum(1 for p, _, future in self._waiting if p == priority and not future.done())
+
+    @property
+    def running(self):
+        return self._running
@@ -0,0 +1,146 @@
+# Append-only, line-delimited JSON log with a sparse offset index.
+# Cross-process locking uses fcntl.flock, so this module is POSIX-only.
+from contextlib import contextmanager
+from threading import Lock
+import fcntl
+import json
+import os
+
+# Every INDEX_EVERY records we note (record number, byte offset) in the .idx sidecar
+INDEX_EVERY = int(os.getenv("TRANSCRIPT_INDEX_EVERY", "64"))
+# fsync after each append; turn off for throughput when losing the last write is fine
+TRANSCRIPT_FSYNC = os.getenv("TRANSCRIPT_FSYNC", "1") == "1"
+
+
+class AppendLog:
+    """
+    One JSON record per line. Appends take an exclusive flock so several
+    processes can write safely, and cost O(1): we only look at the last
+    index checkpoint and the few records after it. A record torn by a
+    crash (no trailing newline) is ignored by readers and cut off by the
+    next writer.
+    """
+
+    def __init__(self, path, legacy_json=None, index_every=INDEX_EVERY):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.index_every = index_every
+        self._lock = Lock()
+        self._legacy_json = legacy_json
+
+    @contextmanager
+    def _locked(self):
+        # The log opened for appending under the exclusive flock every writer takes
+        with open(self.path, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _migrate(self):
+        # One-off migration from the old read-modify-write JSON array file, done lazily.
+        # Runs under the append lock, so only the first process to get it copies the records.
+        with self._lock:
+            legacy_json, self._legacy_json = self._legacy_json, None
+            if not legacy_json or not os.path.exists(legacy_json):
+                return
+            with self._locked() as f:
+                if f.seek(0, os.SEEK_END):
+                    return  # already migrated, or written to since
+                try:
+                    with open(legacy_json, "r") as legacy:
+                        records = json.load(legacy)
+                except Exception:
+                    records = []
+                for record in records:
+                    self._write(f, record)
+
+    def _last_checkpoint(self):
+        # Returns (record number, byte offset) of the last index entry, or (0, 0)
+        try:
+            with open(self.index_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(size - 64, 0))
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return 0, 0
+        for line in reversed(lines):
+            parts = line.split()
+            if len(parts) == 2:
+                return int(parts[0]), int(parts[1])
+        return 0, 0
+
+    def _checkpoint_for(self, record_no):
+        # Latest index entry at or before record_no
+        best = (0, 0)
+        try:
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) != 2:
+                        continue
+                    n, offset = int(parts[0]), int(parts[1])
+                    if n > record_no:
+                        break
+                    best = (n, offset)
+        except FileNotFoundError:
+            pass
+        return best
+
+    def append(self, record):
+        if self._legacy_json:
+            self._migrate()
+        with self._lock, self._locked() as f:
+            return self._write(f, record)
+
+    def _write(self, f, record):
+        # Appends one record to the locked log and returns its record number
+        data = (json.dumps(record) + "\n").encode("utf-8")
+        record_no, offset = self._last_checkpoint()
+        f.seek(offset)
+        tail = f.read()
+        if tail and not tail.endswith(b"\n"):
+            # Drop a record torn by an earlier crash
+            keep = tail.rfind(b"\n") + 1
+            f.truncate(offset + keep)
+            tail = tail[:keep]
+        record_no += tail.count(b"\n")
+        end = offset + len(tail)
+        f.seek(0, os.SEEK_END)
+        f.write(data)
+        f.flush()
+        if TRANSCRIPT_FSYNC:
+            os.fsync(f.fileno())
+        if record_no > 0 and record_no % self.index_every == 0:
+            with open(self.index_path, "a") as idx:
+                idx.write(f"{record_no} {end}\n")
+        return record_no
+
+    def read(self, offset=0, limit=None):
+        """
+        Returns (records from record number `offset` on, next offset). Pass
+        the returned offset back in to tail the log.
+        """
+        if self._legacy_json:
+            self._migrate()
+        records = []
+        record_no, byte_offset = self._checkpoint_for(offset)
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(byte_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn record at the end
+                    if record_no >= offset:
+                        if limit is not None and len(records) >= limit:
+                            break
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            records.append(None)
+                    record_no += 1
+        except FileNotFoundError:
+            return [], offset
+        return [r for r in records if r is not None], offset + len(records)
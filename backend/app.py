@@ -1,12 +1,21 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 from agents.agent_factory import create_agents_for_session
 from summarizer.gemini import summarize_conversation, create_pitch_deck, simulate_investor_qa, generate_risk_map
-from report.pdf_generator import generate_pdf_report
-import requests
-from threading import Lock
+from summarizer.pipeline import ARTIFACTS, generate_artifacts
+from summarizer.precompute import Precomputer
+from summarizer.cache import gemini_cache
+from report.pdf_generator import report_cache
+from roundtable.jobs import JobManager, RoundtableJob, agent_breakers
+from roundtable.registry import agent_registry
+from session.store import make_session_store, DEFAULT_SESSION_ID
+import io
+import json
+import time
+from common.metrics import registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from common.tracing import tracer, render_waterfall
 
 load_dotenv()
 
@@ -16,9 +25,48 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True, allow_headers="*", methods=["GET", "POST", "OPTIONS"])
 
-# --- AGENT COMMENT FEED ---
-agent_comments = []
-agent_comments_lock = Lock()
+# --- SESSIONS AND AGENT COMMENT FEED ---
+sessions = make_session_store()
+roundtable_jobs = JobManager()
+agent_registry.start()
+# Generates the Outcome artifacts in the background once a transcript goes quiet
+precomputer = Precomputer(sessions)
+precomputer.start()
+
+# --- METRICS ---
+HTTP_REQUEST_SECONDS = registry.histogram('http_request_seconds', 'Flask request latency', ('route', 'method', 'status'))
+registry.gauge('feed_sessions', 'Live sessions', fn=lambda: {(): sessions.feed_sizes()[0]})
+registry.gauge('feed_comments', 'Comments retained across all session feeds', fn=lambda: {(): sessions.feed_sizes()[1]})
+registry.gauge('feed_transcript_messages', 'Transcript messages retained across sessions', fn=lambda: {(): sessions.feed_sizes()[2]})
+registry.gauge('gemini_cache_events', 'Gemini cache lookups by outcome', ('outcome',),
+               fn=lambda: {(k,): v for k, v in gemini_cache.snapshot().items() if k in ('memory_hits', 'disk_hits', 'misses')})
+registry.gauge('outcome_precompute_events', 'Background Outcome artifact generation by outcome', ('outcome',),
+               fn=lambda: {(k,): v for k, v in precomputer.stats.items()})
+registry.gauge('agent_replica_inflight', 'Turns in flight per registered agent replica', ('agent', 'address'),
+               fn=lambda: {(a['agent'], a['address']): a['inflight'] for a in agent_registry.snapshot()['agents']})
+registry.gauge('roundtable_agent_circuit_open', 'Agents currently skipped by their circuit breaker', ('agent',),
+               fn=lambda: {(name,): int(state != 'closed') for name, state in agent_breakers.snapshot().items()})
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        # Label by URL rule, not the raw path, so ids don't explode cardinality
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(registry.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+FEED_PAGE_LIMIT = int(os.getenv('FEED_PAGE_LIMIT', '200'))
+# How often an idle stream sends a keep-alive comment so proxies don't drop it
+STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', '15'))
 
 @app.route('/')
 def index():
@@ -32,14 +80,18 @@ def keys_check():
         'gemini_api_key_loaded': bool(GEMINI_API_KEY)
     })
 
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(gemini_cache.snapshot())
+
 @app.route('/api/start-session', methods=['POST'])
 def start_session():
     data = request.json
     agent_configs = data.get('agents', [])
     agents = create_agents_for_session(agent_configs)
-    print(f"[DEBUG] Created {len(agents)} agents for session.")
-    # In a real implementation, you would store the session and agent state
-    return jsonify({'session_id': 'stub-session-id', 'status': 'started', 'agents': agents})
+    session = sessions.create(agents=agents, idea=data.get('idea'))
+    print(f"[DEBUG] Created {len(agents)} agents for session {session.id}.")
+    return jsonify({'session_id': session.id, 'status': 'started', 'agents': agents})
 
 @app.route('/api/agent-message', methods=['POST'])
 def agent_message():
@@ -53,90 +105,304 @@ def agent_message():
         print("[DEBUG] Missing required fields in agent_message")
         return jsonify({'error': 'recipient and text required', 'payload': data}), 400
 
-    # Map agent names to ports (must match run_agents.py logic)
-    agent_ports = {
-        'PM-neutral': 8000,
-        'CTO-cautious': 8001,
-        'Investor-skeptical': 8002,
-        'Marketer-optimistic': 8003,
-        'CEO-supportive': 8004,
-    }
-
-    # Start the roundtable by sending to the first agent
-    roundtable = []
-    current_sender = sender
-    current_message = text
-    visited = set()
-    agent_order = [recipient]
-    # Build order: recipient, then round robin through all agents (excluding recipient)
-    for name in agent_ports:
-        if name != recipient:
-            agent_order.append(name)
-
-    for agent_name in agent_order:
-        port = agent_ports.get(agent_name)
-        if port is None:
-            continue
-        endpoint = f'http://127.0.0.1:{port}/submit'
-        payload = {"message": current_message}
-        try:
-            resp = requests.post(endpoint, json=payload, timeout=30)
-            resp.raise_for_status()
-            agent_reply = resp.json().get('message', '')
-            roundtable.append({'from': agent_name, 'reply': agent_reply})
-            # The next agent gets the previous agent's reply
-            current_message = agent_reply
-            current_sender = agent_name
-        except Exception as e:
-            print(f"[DEBUG] Error contacting agent {agent_name}: {e}")
-            roundtable.append({'from': agent_name, 'reply': f'[Error: {e}]'})
-            # Stop the roundtable if an agent fails
-            break
-
-    return jsonify({'replies': roundtable})
+    # A session's own roster takes its turns; otherwise the runtimes' default roster
+    session_id = data.get('session_id')
+    session = sessions.get(session_id) if session_id else None
+    agents = [a['name'] for a in session.agents] if session is not None and session.agents else None
+
+    # Each roundtable is one trace, continued from the caller's traceparent if it sent one
+    with tracer.span('agent_message', parent=request.headers.get('traceparent'), root=True, recipient=recipient):
+        # The roundtable runs as a background job; clients poll or stream its replies.
+        # Replies reach the session feed from the agent runtime, which posts every turn it takes.
+        job = roundtable_jobs.submit(RoundtableJob(sender, recipient, text, session_id, agents=agents))
+    if data.get('wait'):
+        # Old blocking behaviour for scripts that want all replies in one response
+        job.future.result()
+        return jsonify({'job_id': job.id, 'status': job.status, 'replies': job.replies, 'trace_id': job.trace_id})
+    return jsonify({'job_id': job.id, 'status': job.status, 'trace_id': job.trace_id}), 202
+
+@app.route('/api/agent-message/<job_id>', methods=['GET'])
+def agent_message_status(job_id):
+    job = roundtable_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'unknown job'}), 404
+    return jsonify(job.snapshot(request.args.get('since', default=0, type=int)))
+
+@app.route('/api/agent-message/<job_id>/stream', methods=['GET'])
+def agent_message_stream(job_id):
+    job = roundtable_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'unknown job'}), 404
+    cursor = request.args.get('since', default=0, type=int)
+
+    def generate(cursor):
+        while True:
+            if not job.wait(cursor, timeout=STREAM_HEARTBEAT_SECONDS):
+                yield ": keep-alive\n\n"
+                continue
+            replies, next_cursor = job.since(cursor)
+            for i, reply in enumerate(replies):
+                yield f"id: {cursor + i + 1}\nevent: reply\ndata: {json.dumps(reply)}\n\n"
+            cursor = next_cursor
+            if job.finished and cursor >= len(job.replies):
+                yield f"event: end\ndata: {json.dumps({'status': job.status, 'error': job.error})}\n\n"
+                return
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate(cursor)), mimetype='text/event-stream', headers=headers)
+
+@app.route('/api/agent-message/<job_id>/cancel', methods=['POST'])
+def agent_message_cancel(job_id):
+    job = roundtable_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'unknown job'}), 404
+    return jsonify({'job_id': job.id, 'status': job.status})
+
+@app.route('/api/agents/register', methods=['POST'])
+def register_agents():
+    # Agent runtimes announce {address, agents: [{role, personality, capacity, default}]} on every heartbeat
+    data = request.get_json(force=True)
+    if not data.get('address') or not isinstance(data.get('agents'), list):
+        return jsonify({'error': 'address and agents required'}), 400
+    agent_registry.register(data['address'], data['agents'])
+    return jsonify({'status': 'ok'})
+
+@app.route('/api/agents', methods=['GET'])
+def list_agents():
+    return jsonify(agent_registry.snapshot())
+
+@app.route('/api/traces', methods=['GET'])
+def list_traces():
+    return jsonify({'traces': tracer.collector.recent(request.args.get('limit', default=50, type=int))})
+
+@app.route('/api/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    # ?format=text returns the waterfall as plain text
+    spans = tracer.collector.get(trace_id)
+    if not spans:
+        return jsonify({'error': 'unknown trace'}), 404
+    if request.args.get('format') == 'text':
+        return Response(render_waterfall(spans) + "\n", mimetype='text/plain')
+    return jsonify({'trace_id': trace_id, 'spans': spans})
+
+@app.route('/api/traces', methods=['POST'])
+def ingest_spans():
+    # Local collector for spans exported by the agent runtimes
+    spans = (request.get_json(force=True) or {}).get('spans') or []
+    tracer.collector.add(s for s in spans if isinstance(s, dict) and s.get('trace_id'))
+    return jsonify({'status': 'ok', 'accepted': len(spans)})
 
 @app.route('/api/agent-comment', methods=['POST'])
 def agent_comment():
     data = request.json
     # Optionally add a timestamp here
     print("just posted",data)
-    with agent_comments_lock:
-        agent_comments.append(data)
-    return jsonify({"status": "ok"})
+    session = sessions.get_or_create(data.get('session_id'))
+    entry = _add_comment(session, data)
+    return jsonify({"status": "ok", "seq": entry['seq']})
+
+@app.route('/api/agent-comments/bulk', methods=['POST'])
+def agent_comments_bulk():
+    # Batched ingest used by the agents' publisher
+    data = request.get_json(force=True) or {}
+    comments = data.get('comments', [])
+    last_seq = {}
+    for comment in comments:
+        session = sessions.get_or_create(comment.get('session_id'))
+        trace, queued_at = comment.pop('trace', None), comment.pop('queued_at', None)
+        last_seq[session.id] = _add_comment(session, comment)['seq']
+        if trace and queued_at:
+            # From post_agent_comment to stored in the feed: publisher batching plus this request
+            tracer.record('comment.publish', queued_at, parent=trace, agent=comment.get('agent'), partial=bool(comment.get('partial')))
+    return jsonify({"status": "ok", "accepted": len(comments), "seq": last_seq})
+
+def _add_comment(session, comment):
+    entry = session.add_comment(comment)
+    # Any new message makes background Outcome artifacts for the session stale
+    precomputer.note_activity(session.id)
+    return entry
+
+def _feed_session():
+    # Feed readers without a session id see the shared default session
+    session_id = request.args.get('session_id')
+    if not session_id or session_id == DEFAULT_SESSION_ID:
+        return sessions.get_or_create(DEFAULT_SESSION_ID)
+    return sessions.get(session_id)
 
 @app.route('/api/conversation-feed', methods=['GET'])
 def conversation_feed():
-    with agent_comments_lock:
-        return jsonify({"comments": agent_comments})
+    # Clients pass back the cursor from the previous call and only get newer comments
+    since = request.args.get('since', default=0, type=int)
+    # A limit below 1 would return no comments and never advance the cursor
+    limit = max(1, min(request.args.get('limit', default=FEED_PAGE_LIMIT, type=int), FEED_PAGE_LIMIT))
+    session = _feed_session()
+    if session is None:
+        return jsonify({'error': 'unknown or expired session'}), 404
+    comments, cursor = session.feed.since(since, limit)
+    return jsonify({"comments": comments, "cursor": cursor})
+
+@app.route('/api/conversation-stream', methods=['GET'])
+def conversation_stream():
+    # Server-Sent Events: push each comment as soon as it is posted.
+    # EventSource resends the last seen id in Last-Event-ID when it reconnects.
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since') or 0
+    try:
+        cursor = int(last_event_id)
+    except ValueError:
+        cursor = 0
+    session = _feed_session()
+    if session is None:
+        return jsonify({'error': 'unknown or expired session'}), 404
+    feed = session.feed
+
+    def generate(cursor):
+        yield "retry: 2000\n\n"
+        while True:
+            if not feed.wait_for(cursor, timeout=STREAM_HEARTBEAT_SECONDS):
+                yield ": keep-alive\n\n"
+                continue
+            comments, cursor = feed.since(cursor, FEED_PAGE_LIMIT)
+            for c in comments:
+                yield f"id: {c['seq']}\nevent: comment\ndata: {json.dumps(c)}\n\n"
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate(cursor)), mimetype='text/event-stream', headers=headers)
+
+def _store_artifact(data, name, value):
+    # Keep generated artifacts with their session so they share its lifetime
+    session_id = data.get('session_id') or data.get('sessionId')
+    session = sessions.get(session_id) if session_id else None
+    if session is not None:
+        session.set_artifact(name, value)
+
+def _outcome_session(data):
+    return sessions.get(data.get('session_id') or data.get('sessionId') or DEFAULT_SESSION_ID)
+
+def _precomputed(data, name, version):
+    # Artifact generated in the background for exactly the transcript version being asked about
+    if version is None:
+        return None
+    session = _outcome_session(data)
+    return precomputer.get(session, name, version) if session is not None else None
+
+def _outcome_transcript(data):
+    """
+    Outcome endpoints read the conversation from the session instead of
+    having the client post it back. An optional 'version' (the feed cursor
+    the client had reached) pins the transcript to what the user saw.
+    Returns (messages or Transcript, version), or (None, None) for an
+    unknown session. A posted 'messages' list is still honoured for
+    scripts that have no session.
+    """
+    if data.get('messages') is not None:
+        return data['messages'], None
+    session = _outcome_session(data)
+    if session is None:
+        return None, None
+    transcript = session.transcript
+    version = data.get('version')
+    if isinstance(version, int) and version < transcript.version:
+        return session.messages(version), version
+    return transcript, transcript.version
 
 @app.route('/api/complete-session', methods=['POST'])
 def complete_session():
     data = request.json
-    messages = data.get('messages', [])
-    # Use Gemini to summarize the conversation
-    try:
-        summary = summarize_conversation(messages)
-    except Exception as e:
-        summary = f"Gemini summarization failed: {str(e)}"
-    # Generate PDF report
-    pdf_path = generate_pdf_report(summary)
-    # For demo, serve the PDF directly (in production, use secure static hosting)
-    return jsonify({'report_url': '/api/download-report', 'summary': summary})
+    messages, version = _outcome_transcript(data)
+    if messages is None:
+        return jsonify({'error': 'unknown or expired session'}), 404
+    session = _outcome_session(data) if version is not None else None
+    if session is not None:
+        # The user is about to open the Outcome page: start the other artifacts now
+        precomputer.schedule(session, version, names=[n for n in ARTIFACTS if n != 'summary'], pinned=True)
+    with tracer.span('complete_session', parent=request.headers.get('traceparent'), root=True) as span:
+        summary = _precomputed(data, 'summary', version)
+        if summary is None:
+            # Use Gemini to summarize the conversation
+            try:
+                summary = summarize_conversation(messages, data.get('session_id'))
+                if session is not None:
+                    precomputer.put(session, 'summary', version, summary)
+            except Exception as e:
+                summary = f"Gemini summarization failed: {str(e)}"
+        report_url = _store_report(data, summary)
+    return jsonify({'report_url': report_url, 'summary': summary, 'version': version, 'trace_id': span and span.trace_id})
+
+def _store_report(data, summary):
+    # Reports are rendered in memory per session; nothing is written to disk
+    session_id = data.get('session_id') or data.get('sessionId')
+    session = (sessions.get(session_id) if session_id else None) or sessions.get_or_create(DEFAULT_SESSION_ID)
+    session.set_artifact('summary', summary)
+    report_cache.get_or_render(session.id, summary)
+    return f'/api/download-report?session_id={session.id}'
 
 @app.route('/api/pitch-deck', methods=['POST'])
 def pitch_deck():
     data = request.json
-    messages = data.get('messages', [])
+    messages, version = _outcome_transcript(data)
+    if messages is None:
+        return jsonify({'error': 'unknown or expired session'}), 404
     try:
-        deck = create_pitch_deck(messages)
+        deck = _precomputed(data, 'pitch_deck', version) or create_pitch_deck(messages, data.get('session_id'))
+        _store_artifact(data, 'pitch_deck', deck)
         return jsonify({'pitch_deck': deck})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/outcome-bundle', methods=['POST'])
+def outcome_bundle():
+    # Generates summary, pitch deck, investor Q&A and risk map concurrently.
+    # With stream=true each artifact is sent as an NDJSON line the moment it is ready.
+    data = request.json
+    messages, version = _outcome_transcript(data)
+    if messages is None:
+        return jsonify({'error': 'unknown or expired session'}), 404
+    names = [n for n in (data.get('artifacts') or ARTIFACTS) if n in ARTIFACTS]
+    stream = bool(data.get('stream'))
+
+    def generated():
+        # Precomputed artifacts first, then whatever still has to go to Gemini
+        ready = {name: _precomputed(data, name, version) for name in names}
+        for name, value in ready.items():
+            if value is not None:
+                yield name, value, None
+        missing = [name for name, value in ready.items() if value is None]
+        if missing:
+            yield from generate_artifacts(messages, missing, data.get('session_id'))
+
+    def results():
+        with tracer.span('outcome_bundle', parent=request.headers.get('traceparent'), root=True, artifacts=names):
+            for name, value, error in generated():
+                if error is None:
+                    _store_artifact(data, name, value)
+                result = {'artifact': name, 'value': value, 'error': error}
+                if name == 'summary' and error is None:
+                    result['report_url'] = _store_report(data, value)
+                yield result
+
+    if stream:
+        lines = (json.dumps(r) + "\n" for r in results())
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+    bundle = {'artifacts': {}, 'errors': {}}
+    for r in results():
+        if r['error'] is None:
+            bundle['artifacts'][r['artifact']] = r['value']
+        else:
+            bundle['errors'][r['artifact']] = r['error']
+        if 'report_url' in r:
+            bundle['report_url'] = r['report_url']
+    return jsonify(bundle)
+
 @app.route('/api/download-report', methods=['GET'])
 def download_report():
-    # Always returns the latest generated report
-    return send_file('business_report.pdf', as_attachment=True)
+    # Returns the report for this session's latest summary, straight from memory
+    session = _feed_session()
+    summary = session.get_artifact('summary') if session is not None else None
+    if summary is None:
+        return jsonify({'error': 'no report for this session'}), 404
+    pdf = report_cache.get_or_render(session.id, summary)
+    return send_file(io.BytesIO(pdf), mimetype='application/pdf', as_attachment=True, download_name='business_report.pdf')
 
 @app.route('/api/simulate-conflict', methods=['POST'])
 def simulate_conflict():
@@ -208,9 +474,12 @@ def resolve_conflict():
 @app.route('/api/investor-qa', methods=['POST'])
 def investor_qa():
     data = request.json
-    messages = data.get('messages', [])
+    messages, version = _outcome_transcript(data)
+    if messages is None:
+        return jsonify({'error': 'unknown or expired session'}), 404
     try:
-        qa = simulate_investor_qa(messages)
+        qa = _precomputed(data, 'qa', version) or simulate_investor_qa(messages, data.get('session_id'))
+        _store_artifact(data, 'qa', qa)
         return jsonify({'qa': qa})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -218,9 +487,12 @@ def investor_qa():
 @app.route('/api/risk-map', methods=['POST'])
 def risk_map():
     data = request.json
-    messages = data.get('messages', [])
+    messages, version = _outcome_transcript(data)
+    if messages is None:
+        return jsonify({'error': 'unknown or expired session'}), 404
     try:
-        riskmap = generate_risk_map(messages)
+        riskmap = _precomputed(data, 'riskmap', version) or generate_risk_map(messages, data.get('session_id'))
+        _store_artifact(data, 'riskmap', riskmap)
         return jsonify({'riskmap': riskmap})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,161 @@
+# Headless batch runner: screens many ideas through the roundtable and the Outcome artifacts
+#
+#   python -m batch.run_batch ideas.jsonl --out batch_results --workers 8
+#
+# The ideas file has one idea per line, either plain text (default roster) or
+#   {"id": "optional", "idea": "...", "roster": [{"role": "CTO", "personality": "cautious"}, ...]}
+#
+# Needs the agent runtime (agents/run_agents.py) and GEMINI_API_KEY, or the stubs in bench/.
+# Results are appended to <out>/results.jsonl and reports written to <out>/reports/<id>.pdf.
+# Re-running the same command skips ideas that already finished, so an interrupted run
+# picks up where it stopped. Provider limits (GEMINI_MAX_CONCURRENCY, GEMINI_RATE_PER_SEC)
+# apply per worker process.
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from roundtable.jobs import DONE, RoundtableJob, default_agents, run_roundtable
+from summarizer.pipeline import ARTIFACTS, generate_artifacts
+from report.pdf_generator import generate_pdf_report
+
+RESULTS_FILE = 'results.jsonl'
+REPORTS_DIR = 'reports'
+
+
+def load_ideas(path):
+    ideas = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = line
+            if not isinstance(item, dict):
+                item = {'idea': str(item)}
+            roster = item.get('roster') or []
+            # No roster: the runtimes' default roster, resolved when the idea runs
+            agents = [f"{a['role']}-{a.get('personality') or 'neutral'}" for a in roster]
+            # Stable ids let a re-run recognise ideas it already finished
+            idea_id = str(item.get('id') or hashlib.sha1(json.dumps([item['idea'], agents]).encode('utf-8')).hexdigest()[:12])
+            ideas.setdefault(idea_id, {'id': idea_id, 'idea': item['idea'], 'agents': agents})
+    return list(ideas.values())
+
+
+def load_finished(path):
+    # Ids already written with status 'done'; failed ideas are run again
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            if result.get('status') == 'done':
+                finished.add(result['id'])
+    return finished
+
+
+def run_idea(item, out_dir, names):
+    """One idea end to end: roundtable, artifacts, PDF. Runs in a worker process."""
+    started = time.perf_counter()
+    session_id = f"batch-{item['id']}"
+    messages = [{'sender': 'User', 'text': item['idea']}]
+    agents = item['agents'] or default_agents()
+    result = {'id': item['id'], 'idea': item['idea'], 'agents': agents, 'status': 'failed',
+              'transcript': messages, 'artifacts': {}, 'errors': {}, 'report': None}
+
+    job = RoundtableJob('User', agents[0], item['idea'], session_id, agents=agents)
+    run_roundtable(job, lambda job, reply: messages.append({'sender': reply['from'], 'text': reply['reply']}))
+    if job.status != DONE:
+        result['errors']['roundtable'] = job.error
+        result['seconds'] = round(time.perf_counter() - started, 2)
+        return result
+
+    for name, value, error in generate_artifacts(messages, names, session_id):
+        if error is None:
+            result['artifacts'][name] = value
+        else:
+            result['errors'][name] = error
+    if 'summary' in result['artifacts']:
+        try:
+            result['report'] = generate_pdf_report(result['artifacts']['summary'],
+                                                   os.path.join(out_dir, REPORTS_DIR, f"{item['id']}.pdf"))
+        except Exception as e:
+            result['errors']['report'] = str(e)
+    if not result['errors']:
+        result['status'] = 'done'
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def _open_results(path):
+    results = open(path, 'a+', encoding='utf-8')
+    # Terminate a line torn by an interrupted run so the next record starts clean
+    if results.tell() > 0:
+        results.seek(results.tell() - 1)
+        if results.read(1) != '\n':
+            results.write('\n')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run many startup ideas through the roundtable without the UI')
+    parser.add_argument('ideas', help='ideas file: plain text or JSON lines')
+    parser.add_argument('--out', default='batch_results')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='ideas processed at the same time')
+    parser.add_argument('--artifacts', nargs='+', default=list(ARTIFACTS), choices=list(ARTIFACTS))
+    parser.add_argument('--limit', type=int, default=None, help='stop after this many ideas')
+    args = parser.parse_args()
+
+    os.makedirs(os.path.join(args.out, REPORTS_DIR), exist_ok=True)
+    results_path = os.path.join(args.out, RESULTS_FILE)
+    finished = load_finished(results_path)
+    todo = [item for item in load_ideas(args.ideas) if item['id'] not in finished][:args.limit]
+    print(f"{len(finished)} ideas already done, {len(todo)} to run with {args.workers} workers")
+
+    started = time.perf_counter()
+    counts = {'done': 0, 'failed': 0}
+    queue = iter(todo)
+    with _open_results(results_path) as results, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pending = {}
+
+        def fill():
+            # Only as many ideas in flight as there are workers, so memory stays flat
+            for item in queue:
+                pending[pool.submit(run_idea, item, args.out, args.artifacts)] = item
+                if len(pending) >= args.workers:
+                    break
+
+        fill()
+        while pending:
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                item = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'id': item['id'], 'idea': item['idea'], 'agents': item['agents'],
+                              'status': 'failed', 'errors': {'worker': str(e)}}
+                results.write(json.dumps(result) + '\n')
+                results.flush()
+                os.fsync(results.fileno())
+                counts[result['status']] += 1
+                print(f"[{counts['done'] + counts['failed']}/{len(todo)}] {item['id']} {result['status']}"
+                      + (f" {result['errors']}" if result['errors'] else ''))
+            fill()
+
+    elapsed = time.perf_counter() - started
+    print(f"{counts['done']} done, {counts['failed']} failed in {elapsed:.1f}s"
+          + (f" ({(counts['done'] + counts['failed']) / elapsed * 60:.1f} ideas/min)" if elapsed and todo else ''))
+
+
+if __name__ == '__main__':
+    main()
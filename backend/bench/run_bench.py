@@ -0,0 +1,188 @@
+# End-to-end load benchmark for the backend and agent runtime
+#
+#   python -m bench.run_bench --scenario feed --concurrency 20 --requests 500
+#   python -m bench.run_bench --scenario sse --concurrency 20 --requests 200
+#   python -m bench.run_bench --scenario all --concurrency 8 --requests 50
+#
+# Start bench/stub_llm.py first and point the backend/agents at it to run offline.
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import threading
+import json
+import math
+import time
+import uuid
+
+from common import http_client
+
+SCENARIOS = ['comment', 'feed', 'sse', 'agent-message', 'roundtable', 'outcome']
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return sorted_values[int(k)]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _messages(n, nonce):
+    roles = ['PM-neutral', 'CTO-cautious', 'Investor-skeptical', 'Marketer-optimistic', 'CEO-supportive']
+    return [{'sender': roles[i % len(roles)], 'text': f"Point {i} about the plan ({nonce})"} for i in range(n)]
+
+
+class Bench:
+    def __init__(self, args):
+        self.backend = args.backend.rstrip('/')
+        self.agents = args.agents.rstrip('/')
+        self.args = args
+        self.session_id = None
+        # Each worker thread is one client with its own feed cursors
+        self._client = threading.local()
+
+    def setup(self):
+        resp = http_client.post(f"{self.backend}/api/start-session", json={
+            'idea': 'benchmark idea',
+            'agents': [{'role': 'PM', 'personality': 'neutral'}, {'role': 'CTO', 'personality': 'cautious'}],
+        })
+        resp.raise_for_status()
+        self.session_id = resp.json()['session_id']
+        # Seed the feed so reads have something to return
+        for i in range(self.args.seed_comments):
+            http_client.post(f"{self.backend}/api/agent-comment", json={
+                'agent': 'PM-neutral', 'sender': 'User', 'message': f'seed {i}', 'session_id': self.session_id,
+            })
+
+    def comment(self, i):
+        self.comment_text(f'bench comment {i}')
+
+    def comment_text(self, text):
+        resp = http_client.post(f"{self.backend}/api/agent-comment", json={
+            'agent': 'Bench', 'sender': 'User', 'message': text, 'session_id': self.session_id,
+        })
+        resp.raise_for_status()
+
+    def feed(self, i):
+        # Polls like the frontend: each call passes back the cursor of the previous one
+        since = getattr(self._client, 'feed_cursor', 0)
+        resp = http_client.get(f"{self.backend}/api/conversation-feed",
+                               params={'session_id': self.session_id, 'since': since})
+        resp.raise_for_status()
+        self._client.feed_cursor = resp.json()['cursor']
+
+    def sse(self, i):
+        # Time from posting a comment until a subscriber's stream delivers it
+        since = getattr(self._client, 'stream_cursor', 0)
+        marker = f'bench sse {i} {uuid.uuid4().hex}'
+        with http_client.get(f"{self.backend}/api/conversation-stream",
+                             params={'session_id': self.session_id, 'since': since}, stream=True,
+                             timeout=http_client.timeout(read=self.args.job_timeout)) as resp:
+            resp.raise_for_status()
+            self.comment_text(marker)
+            for line in resp.iter_lines(decode_unicode=True):
+                if line.startswith('id:'):
+                    self._client.stream_cursor = int(line[3:])
+                elif line.startswith('data:') and marker in line:
+                    return
+        raise RuntimeError('stream ended before the comment arrived')
+
+    def agent_message(self, i):
+        # Measures the whole job, from submit until the last agent replied
+        resp = http_client.post(f"{self.backend}/api/agent-message", json={
+            'recipient': 'PM-neutral', 'text': f'bench question {i}', 'session_id': self.session_id,
+        })
+        resp.raise_for_status()
+        job_id = resp.json()['job_id']
+        deadline = time.monotonic() + self.args.job_timeout
+        while time.monotonic() < deadline:
+            status = http_client.get(f"{self.backend}/api/agent-message/{job_id}").json()
+            if status['status'] in ('done', 'failed', 'cancelled'):
+                if status['status'] != 'done':
+                    raise RuntimeError(status.get('error') or status['status'])
+                return
+            time.sleep(self.args.poll_interval)
+        raise TimeoutError(f"job {job_id} did not finish")
+
+    def roundtable(self, i):
+        resp = http_client.post(f"{self.agents}/start_roundtable", json={
+            'message': f'bench kickoff {i}', 'session_id': self.session_id, 'mode': self.args.mode,
+        }, timeout=http_client.timeout(read=self.args.job_timeout))
+        resp.raise_for_status()
+
+    def outcome(self, i):
+        # A fresh nonce per request defeats the artifact cache unless --cached is given
+        nonce = 'cached' if self.args.cached else uuid.uuid4().hex
+        resp = http_client.post(f"{self.backend}/api/outcome-bundle", json={
+            'session_id': self.session_id, 'messages': _messages(self.args.transcript_len, nonce),
+        }, timeout=http_client.timeout(read=self.args.job_timeout))
+        resp.raise_for_status()
+        if resp.json().get('errors'):
+            raise RuntimeError(resp.json()['errors'])
+
+    def run(self, scenario):
+        fn = getattr(self, scenario.replace('-', '_'))
+        latencies = []
+        errors = []
+
+        def one(i):
+            start = time.perf_counter()
+            try:
+                fn(i)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(str(e))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            list(pool.map(one, range(self.args.requests)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'scenario': scenario,
+            'requests': self.args.requests,
+            'concurrency': self.args.concurrency,
+            'ok': len(latencies),
+            'errors': len(errors),
+            'first_error': errors[0] if errors else None,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load benchmark for the startup simulator')
+    parser.add_argument('--backend', default='http://127.0.0.1:5000')
+    parser.add_argument('--agents', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenario', default='all', choices=SCENARIOS + ['all'])
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--seed-comments', type=int, default=200)
+    parser.add_argument('--transcript-len', type=int, default=40)
+    parser.add_argument('--mode', default='chain', choices=['chain', 'panel'])
+    parser.add_argument('--cached', action='store_true', help='reuse one transcript so outcome hits the cache')
+    parser.add_argument('--job-timeout', type=float, default=300)
+    parser.add_argument('--poll-interval', type=float, default=0.2)
+    parser.add_argument('--json', action='store_true', help='print one JSON object per scenario')
+    args = parser.parse_args()
+
+    bench = Bench(args)
+    bench.setup()
+    scenarios = SCENARIOS if args.scenario == 'all' else [args.scenario]
+    for scenario in scenarios:
+        result = bench.run(scenario)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{scenario:>14}: {result['ok']}/{result['requests']} ok, "
+                  f"p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  p99 {result['p99_ms']}ms  "
+                  f"{result['throughput_rps']} req/s"
+                  + (f"  [{result['errors']} errors: {result['first_error']}]" if result['errors'] else ''))
+
+
+if __name__ == '__main__':
+    main()
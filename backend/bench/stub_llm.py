@@ -0,0 +1,114 @@
+# Offline stand-in for the ASI1 chat-completions and Gemini generateContent APIs
+#
+#   python -m bench.stub_llm --port 9000 --latency-ms 300 --jitter-ms 100 --error-rate 0.02
+#
+# then run the backend/agents with
+#   ASI1_API_URL=http://127.0.0.1:9000/v1/chat/completions
+#   GEMINI_API_BASE=http://127.0.0.1:9000  GEMINI_API_KEY=stub  ASI1_API_KEY=stub
+import argparse
+import json
+import random
+import time
+import uuid
+
+from flask import Flask, request, jsonify, Response, stream_with_context
+
+app = Flask(__name__)
+
+config = {
+    'latency_ms': 200.0,      # time before the first byte
+    'jitter_ms': 50.0,        # +/- uniform jitter on latency
+    'error_rate': 0.0,        # fraction of requests answered with a 5xx
+    'tokens': 60,             # words per completion
+    'token_delay_ms': 10.0,   # delay between streamed chunks
+}
+
+WORDS = ("market users revenue churn pricing roadmap MVP launch runway burn hiring "
+         "traction retention funnel cohort margin scale moat pilot feedback").split()
+
+
+def _sleep_latency():
+    jitter = random.uniform(-config['jitter_ms'], config['jitter_ms'])
+    time.sleep(max(config['latency_ms'] + jitter, 0) / 1000.0)
+
+
+def _maybe_fail():
+    if random.random() < config['error_rate']:
+        status = random.choice([429, 500, 502, 503])
+        return jsonify({'error': {'code': status, 'message': 'stub injected failure'}}), status
+    return None
+
+
+def _text(n):
+    return " ".join(random.choice(WORDS) for _ in range(n))
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    body = request.get_json(force=True) or {}
+    failure = _maybe_fail()
+    if failure:
+        return failure
+    max_tokens = body.get('max_tokens') or config['tokens']
+    n = min(config['tokens'], max_tokens)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    prompt_tokens = sum(len(str(m.get('content', ''))) // 4 for m in body.get('messages', []))
+
+    if not body.get('stream'):
+        _sleep_latency()
+        return jsonify({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'model': body.get('model', 'stub'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': _text(n)}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': n, 'total_tokens': prompt_tokens + n},
+        })
+
+    def chunks():
+        _sleep_latency()
+        for i in range(n):
+            delta = {'content': random.choice(WORDS) + ('' if i == n - 1 else ' ')}
+            chunk = {'id': completion_id, 'object': 'chat.completion.chunk',
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            time.sleep(config['token_delay_ms'] / 1000.0)
+        yield "data: [DONE]\n\n"
+
+    return Response(stream_with_context(chunks()), mimetype='text/event-stream')
+
+
+@app.route('/v1beta/models/<path:model_action>', methods=['POST'])
+def generate_content(model_action):
+    if not model_action.endswith(':generateContent'):
+        return jsonify({'error': 'not found'}), 404
+    body = request.get_json(force=True) or {}
+    failure = _maybe_fail()
+    if failure:
+        return failure
+    _sleep_latency()
+    prompt = "".join(p.get('text', '') for c in body.get('contents', []) for p in c.get('parts', []))
+    n = config['tokens'] * 4
+    return jsonify({
+        'candidates': [{'content': {'role': 'model', 'parts': [{'text': _text(n)}]}, 'finishReason': 'STOP'}],
+        'usageMetadata': {'promptTokenCount': len(prompt) // 4, 'candidatesTokenCount': n,
+                          'totalTokenCount': len(prompt) // 4 + n},
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline ASI1/Gemini stub server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--latency-ms', type=float, default=config['latency_ms'])
+    parser.add_argument('--jitter-ms', type=float, default=config['jitter_ms'])
+    parser.add_argument('--error-rate', type=float, default=config['error_rate'])
+    parser.add_argument('--tokens', type=int, default=config['tokens'])
+    parser.add_argument('--token-delay-ms', type=float, default=config['token_delay_ms'])
+    args = parser.parse_args()
+    config.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                  tokens=args.tokens, token_delay_ms=args.token_delay_ms)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
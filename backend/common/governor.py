@@ -0,0 +1,120 @@
+# In-process governor for LLM providers: single-flight, concurrency cap and rate limit
+from concurrent.futures import Future
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+import hashlib
+import json
+import os
+import time
+
+
+class SingleFlight:
+    """
+    Identical concurrent calls (same key) share one execution: the first
+    caller runs fn, everyone else waits for and receives its result or
+    exception.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return future.result()
+
+    @property
+    def inflight(self):
+        with self._lock:
+            return len(self._inflight)
+
+
+class TokenBucket:
+    """Blocking token bucket: callers wait for a token rather than being rejected."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return  # unlimited
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Governor:
+    def __init__(self, max_concurrency, rate_per_sec, burst):
+        self.max_concurrency = max_concurrency
+        self._semaphore = BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_sec, burst)
+        self._flights = SingleFlight()
+
+    @contextmanager
+    def slot(self):
+        # Waits for a rate-limit token, then for a free concurrency slot
+        self._bucket.acquire()
+        with self._semaphore:
+            yield
+
+    def call(self, key, fn):
+        """Runs fn under the limits; concurrent calls with the same key share one upstream call."""
+        def limited():
+            with self.slot():
+                return fn()
+        if key is None:
+            return limited()
+        return self.share(key, limited)
+
+    def share(self, key, fn):
+        # Single-flight only; fn is expected to take its own slot(s)
+        return self._flights.do(key, fn)
+
+
+def request_key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+_governors = {}
+_governors_lock = Lock()
+
+
+def get_governor(provider):
+    """
+    Per-provider governor configured from <PROVIDER>_MAX_CONCURRENCY,
+    <PROVIDER>_RATE_PER_SEC (0 = unlimited) and <PROVIDER>_BURST.
+    """
+    with _governors_lock:
+        governor = _governors.get(provider)
+        if governor is None:
+            prefix = provider.upper()
+            governor = _governors[provider] = Governor(
+                int(os.getenv(f'{prefix}_MAX_CONCURRENCY', '8')),
+                float(os.getenv(f'{prefix}_RATE_PER_SEC', '0')),
+                int(os.getenv(f'{prefix}_BURST', '8')),
+            )
+        return governor
@@ -0,0 +1,77 @@
+# Shared, pooled HTTP sessions for every outbound call (LLMs, Gemini, backend feed, agents)
+from threading import Lock
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.tracing import tracer
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '60'))
+# Number of distinct hosts a session keeps pools for, and connections kept per host
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '10'))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '20'))
+# When true, callers wait for a free pooled connection instead of opening extra ones
+HTTP_POOL_BLOCK = os.getenv('HTTP_POOL_BLOCK', '0') == '1'
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+# Pools whose requests carry our traceparent header: internal services only,
+# third-party APIs ('llm', 'gemini') don't get to see trace ids
+TRACE_HEADER_POOLS = set(os.getenv('TRACE_HEADER_POOLS', 'default,feed,agents').split(','))
+
+_sessions = {}
+_sessions_lock = Lock()
+
+
+def _make_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=HTTP_POOL_BLOCK,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(name='default'):
+    """
+    Returns a process-wide keep-alive session. Use a separate name for
+    traffic that should not compete for the same pool (e.g. 'llm' vs 'feed').
+    """
+    session = _sessions.get(name)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _make_session()
+                _sessions[name] = session
+    return session
+
+
+def timeout(read=None, connect=None):
+    return (connect or HTTP_CONNECT_TIMEOUT, read or HTTP_READ_TIMEOUT)
+
+
+def _request(method, url, pool, kwargs):
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    # Inside a trace every call is a span, and calls to our own services carry
+    # a traceparent header (query strings are left out of the span: they can hold API keys)
+    with tracer.span(f'http.{method}', url=url.split('?')[0], pool=pool) as span:
+        if span is None:
+            return getattr(get_session(pool), method)(url, **kwargs)
+        if pool in TRACE_HEADER_POOLS:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, traceparent=span.traceparent)
+        response = getattr(get_session(pool), method)(url, **kwargs)
+        span.set(status=response.status_code)
+        return response
+
+
+def post(url, pool='default', **kwargs):
+    return _request('post', url, pool, kwargs)
+
+
+def get(url, pool='default', **kwargs):
+    return _request('get', url, pool, kwargs)
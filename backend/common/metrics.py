@@ -0,0 +1,175 @@
+# Minimal Prometheus-style metrics: counters, gauges and histograms with labels
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+import bisect
+
+# Seconds; covers fast feed reads up to slow multi-agent LLM chains
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f'{self.name}{_labels(self.labelnames, k)} {v}' for k, v in items]
+
+
+class Gauge(_Metric):
+    """Set directly, or pass fn() -> {label tuple: value} to sample at scrape time."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), fn=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self.fn = fn
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        if self.fn is not None:
+            items = list(self.fn().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return self.header() + [f'{self.name}{_labels(self.labelnames, k)} {v}' for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if idx < len(self.buckets):
+                entry[idx] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = self.header()
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, {"le": bound})} {cumulative}')
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, {"le": "+Inf"})} {entry[-1]}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {entry[-2]}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {entry[-1]}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Modules imported twice (e.g. as script and package) share one metric
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), fn=None):
+        return self._register(Gauge(name, documentation, labelnames, fn))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# Outbound LLM calls, shared by the agent runtime (ASI1) and the backend (Gemini)
+LLM_REQUEST_SECONDS = registry.histogram(
+    'llm_request_seconds', 'Latency of outbound LLM calls', ('provider', 'agent', 'artifact'))
+LLM_FIRST_TOKEN_SECONDS = registry.histogram(
+    'llm_first_token_seconds', 'Time to first streamed token', ('provider', 'agent'))
+LLM_TOKENS = registry.counter(
+    'llm_tokens_total', 'Tokens used by LLM calls', ('provider', 'agent', 'artifact', 'kind'))
+LLM_ERRORS = registry.counter(
+    'llm_errors_total', 'Failed LLM calls', ('provider', 'agent', 'artifact', 'reason'))
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Serves registry.render() at /metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,175 @@
+# Retries with jittered backoff, circuit breakers and hedged calls
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack, nullcontext
+from threading import Event, Lock
+import os
+import random
+import time
+
+from common.tracing import in_context
+
+HEDGE_WORKERS = int(os.getenv('HEDGE_WORKERS', '16'))
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+def backoff_delay(attempt, base=0.25, cap=8.0):
+    # Full jitter: uniform between 0 and the exponential ceiling
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_call(fn, retryable, attempts=3, base=0.25, cap=8.0):
+    """
+    Calls fn up to `attempts` times, sleeping a jittered exponential
+    backoff between tries. Errors for which retryable(e) is false are
+    raised immediately.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt + 1 >= attempts or not retryable(e):
+                raise
+            delay = backoff_delay(attempt, base, cap)
+            print(f"[WARN] Attempt {attempt + 1}/{attempts} failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+
+
+def hedged_call(fn, hedge_after, slot=None):
+    """
+    Runs fn and, if it hasn't finished after hedge_after seconds, starts a
+    second identical call. Returns whichever succeeds first; raises only
+    when both fail. hedge_after <= 0 disables hedging. fn must be safe to
+    run twice.
+
+    slot: optional context manager factory (e.g. Governor.slot) held around
+    each call. The first call's slot is taken before the hedge timer starts,
+    so hedge_after measures only time spent in fn. The hedge waits for its
+    own slot and is dropped if the first call has won by then; a losing
+    call keeps its slot until it finishes.
+    """
+    slot = slot or nullcontext
+    if not hedge_after or hedge_after <= 0:
+        with slot():
+            return fn()
+    settled = Event()
+    held = ExitStack()
+    held.enter_context(slot())
+
+    def run():
+        result = fn()
+        # Set before the slot is released, so a hedge waiting for it sees the race is won
+        settled.set()
+        return result
+
+    def first():
+        with held:
+            return run()
+
+    def hedge():
+        with slot():
+            if settled.is_set():
+                return None
+            return run()
+
+    try:
+        primary = _hedge_executor.submit(in_context(first))
+    except BaseException:
+        held.close()
+        raise
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+    pending = {primary, _hedge_executor.submit(in_context(hedge))}
+    error = None
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        settled.set()
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_seconds`. Then a single trial call is let through: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=3, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+                return True
+            # Open, or a half-open trial is already running
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, fn):
+        if not self.allow():
+            raise CircuitOpenError('circuit open')
+        try:
+            result = fn()
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+class BreakerRegistry:
+    # One lazily created breaker per name (e.g. per agent)
+    def __init__(self, failure_threshold=3, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._breakers = {}
+        self._lock = Lock()
+
+    def get(self, name):
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+            return breaker
+
+    def snapshot(self):
+        with self._lock:
+            return {name: breaker.state for name, breaker in self._breakers.items()}
@@ -0,0 +1,254 @@
+# Dependency-free request tracing: spans, W3C traceparent propagation and local sinks
+#
+# Print a waterfall from a TRACE_FILE export:
+#   python -m common.tracing spans.jsonl [trace_id]
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+import json
+import os
+import sys
+import time
+import uuid
+
+TRACING_ENABLED = os.getenv('TRACING', '1') == '1'
+# Every finished span is also appended here as one JSON line (works across processes)
+TRACE_FILE = os.getenv('TRACE_FILE')
+MAX_TRACES = int(os.getenv('MAX_TRACES', '500'))
+MAX_SPANS_PER_TRACE = int(os.getenv('MAX_SPANS_PER_TRACE', '2000'))
+EXPORT_BATCH = 200
+EXPORT_FLUSH_SECONDS = 0.5
+
+# (trace_id, span_id) of the span the current code runs under
+_current = ContextVar('trace_span', default=None)
+
+
+def in_context(fn):
+    # Wraps fn to run in a copy of the caller's context, so work handed to a
+    # thread pool stays under the span that submitted it
+    context = copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def format_traceparent(trace_id, span_id):
+    return f"00-{trace_id}-{span_id}-01"
+
+
+def parse_traceparent(value):
+    # Returns (trace_id, span_id), or None for a missing/malformed header
+    parts = (value or '').split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, service='', start=None, **attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.service = service
+        self.start = time.time() if start is None else start
+        self.duration = None
+        self.error = None
+        self.attrs = attrs
+
+    @property
+    def traceparent(self):
+        return format_traceparent(self.trace_id, self.span_id)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id,
+            'name': self.name, 'service': self.service, 'start': self.start,
+            'duration': self.duration, 'error': self.error, 'attrs': self.attrs,
+        }
+
+
+class Collector:
+    """Keeps the spans of the most recent traces in memory, oldest trace evicted first."""
+
+    def __init__(self, max_traces=MAX_TRACES):
+        self.max_traces = max_traces
+        self._traces = OrderedDict()
+        self._lock = Lock()
+
+    def add(self, spans):
+        with self._lock:
+            for span in spans:
+                trace = self._traces.get(span['trace_id'])
+                if trace is None:
+                    trace = self._traces[span['trace_id']] = []
+                if len(trace) < MAX_SPANS_PER_TRACE:
+                    trace.append(span)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id):
+        with self._lock:
+            spans = list(self._traces.get(trace_id, ()))
+        return sorted(spans, key=lambda s: s['start'])
+
+    def recent(self, limit=50):
+        with self._lock:
+            traces = list(self._traces.items())[-limit:]
+        summaries = []
+        for trace_id, spans in reversed(traces):
+            start = min(s['start'] for s in spans)
+            end = max(s['start'] + (s['duration'] or 0) for s in spans)
+            root = next((s for s in spans if s['parent_id'] is None), spans[0])
+            summaries.append({'trace_id': trace_id, 'name': root['name'], 'start': start,
+                              'duration': round(end - start, 4), 'spans': len(spans)})
+        return summaries
+
+
+def render_waterfall(spans, width=50):
+    """Text timeline: one row per span, indented under its parent, bar scaled to the trace."""
+    if not spans:
+        return ''
+    spans = sorted(spans, key=lambda s: s['start'])
+    t0 = spans[0]['start']
+    total = max(s['start'] + (s['duration'] or 0) for s in spans) - t0 or 1e-9
+    ids = {s['span_id'] for s in spans}
+    children = {}
+    for s in spans:
+        parent = s['parent_id'] if s['parent_id'] in ids else None
+        children.setdefault(parent, []).append(s)
+
+    lines = [f"trace {spans[0]['trace_id']}  {total * 1000:.1f} ms, {len(spans)} spans"]
+
+    def walk(parent, depth):
+        for s in children.get(parent, ()):
+            offset = int((s['start'] - t0) / total * width)
+            length = max(int((s['duration'] or 0) / total * width), 1)
+            bar = ' ' * offset + '#' * min(length, width - offset)
+            label = f"{'  ' * depth}{s['service']}:{s['name']}"
+            agent = s['attrs'].get('agent')
+            if agent:
+                label += f" [{agent}]"
+            if s['error']:
+                label += ' !'
+            lines.append(f"{label[:44]:<44} {(s['start'] - t0) * 1000:>8.1f} {(s['duration'] or 0) * 1000:>8.1f} ms |{bar:<{width}}|")
+            walk(s['span_id'], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+class Tracer:
+    def __init__(self, service='backend'):
+        self.service = service
+        self.collector = Collector()
+        self.collector_url = None
+        self._queue = None
+        self._file_lock = Lock()
+
+    def configure(self, service=None, collector_url=None):
+        """
+        collector_url: POST finished spans there (e.g. the backend's
+        /api/traces) instead of keeping them in this process's collector.
+        """
+        if service:
+            self.service = service
+        if collector_url:
+            self.collector_url = collector_url
+            self._queue = Queue(maxsize=10000)
+            Thread(target=self._export_loop, name='trace-export', daemon=True).start()
+
+    def current(self):
+        return _current.get()
+
+    def traceparent(self):
+        # Header value for the current span, '' outside a trace
+        current = _current.get()
+        return format_traceparent(*current) if current else ''
+
+    @contextmanager
+    def span(self, name, parent=None, root=False, **attrs):
+        """
+        Records the block as a span under `parent` (a traceparent string),
+        else under the current span. Outside any trace nothing is recorded
+        unless root=True starts a new trace.
+        """
+        context = parse_traceparent(parent) if isinstance(parent, str) else parent
+        context = context or _current.get()
+        if not TRACING_ENABLED or (context is None and not root):
+            yield None
+            return
+        trace_id, parent_id = context or (uuid.uuid4().hex, None)
+        span = Span(name, trace_id, parent_id, self.service, **attrs)
+        token = _current.set((trace_id, span.span_id))
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current.reset(token)
+            self._finish(span)
+
+    def record(self, name, start, end=None, parent=None, error=None, **attrs):
+        # A span whose timing was measured elsewhere (e.g. queue time between processes)
+        context = parse_traceparent(parent) if isinstance(parent, str) else parent
+        context = context or _current.get()
+        if not TRACING_ENABLED or context is None:
+            return
+        span = Span(name, context[0], context[1], self.service, start=start, **attrs)
+        span.duration = max((end or time.time()) - start, 0.0)
+        span.error = error
+        self._finish(span)
+
+    def _finish(self, span):
+        data = span.to_dict()
+        if TRACE_FILE:
+            with self._file_lock, open(TRACE_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(data) + "\n")
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(data)
+            except Full:
+                pass  # tracing must never hold up the traced code
+        else:
+            self.collector.add([data])
+
+    def _export_loop(self):
+        from common import http_client
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EXPORT_FLUSH_SECONDS
+            while len(batch) < EXPORT_BATCH:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except Empty:
+                    break
+            try:
+                http_client.post(self.collector_url, pool='feed', json={'spans': batch}, timeout=http_client.timeout(read=5))
+            except Exception as e:
+                print(f"[WARN] Dropped {len(batch)} spans: {e}")
+
+
+tracer = Tracer()
+
+
+def _main(argv):
+    if not argv:
+        print('usage: python -m common.tracing TRACE_FILE [trace_id]')
+        return
+    collector = Collector(max_traces=10 ** 6)
+    with open(argv[0], encoding='utf-8') as f:
+        collector.add(json.loads(line) for line in f if line.strip())
+    trace_ids = argv[1:] or [t['trace_id'] for t in collector.recent(10)]
+    for trace_id in trace_ids:
+        print(render_waterfall(collector.get(trace_id)) + "\n")
+
+
+if __name__ == '__main__':
+    _main(sys.argv[1:])
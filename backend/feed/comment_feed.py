@@ -0,0 +1,72 @@
+# Bounded, cursor-addressable feed of agent comments
+from collections import deque
+from threading import Condition
+import os
+
+FEED_MAX_COMMENTS = int(os.getenv('FEED_MAX_COMMENTS', '1000'))
+
+
+class CommentFeed:
+    """
+    Keeps the most recent comments in a ring buffer. Every comment gets a
+    monotonically increasing 'seq' so clients can ask only for what they
+    have not seen yet instead of re-downloading the whole history.
+    """
+
+    def __init__(self, maxlen=FEED_MAX_COMMENTS):
+        self._comments = deque(maxlen=maxlen)
+        self._lock = Condition()
+        self._last_seq = 0
+
+    def append(self, comment):
+        with self._lock:
+            self._last_seq += 1
+            entry = dict(comment)
+            entry['seq'] = self._last_seq
+            self._comments.append(entry)
+            # Wake up any stream waiting for new comments
+            self._lock.notify_all()
+            return entry
+
+    def since(self, cursor=0, limit=None):
+        """
+        Returns (comments newer than cursor, next cursor).
+        If the cursor fell off the end of the ring buffer the client simply
+        gets everything that is still retained.
+        """
+        with self._lock:
+            if cursor > self._last_seq:
+                # Cursor from before a server restart: replay what we have
+                cursor = 0
+            newer = []
+            # Walk backwards from the newest entry so a caught-up client costs O(new)
+            for entry in reversed(self._comments):
+                if entry['seq'] <= cursor:
+                    break
+                newer.append(entry)
+            newer.reverse()
+            if limit is not None:
+                newer = newer[:limit]
+            next_cursor = newer[-1]['seq'] if newer else max(cursor, 0)
+            return newer, next_cursor
+
+    def wait_for(self, cursor, timeout=None):
+        """
+        Blocks until there is a comment newer than cursor or the timeout
+        expires. Returns True if something new arrived.
+        """
+        with self._lock:
+            # A cursor ahead of last_seq comes from before a restart; since() replays it
+            return self._lock.wait_for(
+                lambda: self._last_seq > cursor or (cursor > self._last_seq and len(self._comments) > 0),
+                timeout,
+            )
+
+    @property
+    def last_seq(self):
+        with self._lock:
+            return self._last_seq
+
+    def __len__(self):
+        with self._lock:
+            return len(self._comments)
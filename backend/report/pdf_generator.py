@@ -1,21 +1,97 @@
 # PDF report generation using ReportLab
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from collections import OrderedDict
+from threading import Lock
+from xml.sax.saxutils import escape
+import hashlib
 import io
+import os
 
-def generate_pdf_report(summary, filename='business_report.pdf'):
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+# Rendered reports kept in memory, keyed by (session id, summary hash)
+REPORT_CACHE_BYTES = int(os.getenv('REPORT_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+
+def render_pdf_report(summary):
+    """
+    Renders the summary into PDF bytes. Lines wrap to the page width and
+    flow onto as many pages as needed.
+    """
     buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(40, height - 50, "Startup Planning Session Report")
-    c.setFont("Helvetica", 12)
-    text_object = c.beginText(40, height - 90)
+    doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=40, rightMargin=40,
+                            topMargin=50, bottomMargin=50, title="Startup Planning Session Report")
+    styles = getSampleStyleSheet()
+    body = styles['BodyText']
+    story = [Paragraph("Startup Planning Session Report", styles['Title']), Spacer(1, 0.2 * inch)]
     for line in summary.split('\n'):
-        text_object.textLine(line)
-    c.drawText(text_object)
-    c.save()
-    buffer.seek(0)
+        if not line.strip():
+            story.append(Spacer(1, 6))
+            continue
+        # Keep the summary's own indentation for nested bullets
+        indent = len(line) - len(line.lstrip(' '))
+        style = _indented(body, indent) if indent else body
+        story.append(Paragraph(escape(line.strip()), style))
+    doc.build(story, onFirstPage=_page_number, onLaterPages=_page_number)
+    return buffer.getvalue()
+
+
+_indent_styles = {}
+
+
+def _indented(base, indent):
+    style = _indent_styles.get(indent)
+    if style is None:
+        style = _indent_styles[indent] = ParagraphStyle(f'indent{indent}', parent=base, leftIndent=indent * 4)
+    return style
+
+
+def _page_number(canvas, doc):
+    canvas.saveState()
+    canvas.setFont("Helvetica", 9)
+    canvas.drawRightString(letter[0] - 40, 30, f"Page {doc.page}")
+    canvas.restoreState()
+
+
+def generate_pdf_report(summary, filename='business_report.pdf'):
+    # Writes the report to disk; the web app serves reports from report_cache instead
     with open(filename, 'wb') as f:
-        f.write(buffer.read())
+        f.write(render_pdf_report(summary))
     return filename
+
+
+class ReportCache:
+    """Byte-bounded LRU of rendered reports."""
+
+    def __init__(self, max_bytes=REPORT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._reports = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def key(session_id, summary):
+        return (session_id or '', hashlib.sha256(summary.encode('utf-8')).hexdigest())
+
+    def get_or_render(self, session_id, summary):
+        key = self.key(session_id, summary)
+        with self._lock:
+            pdf = self._reports.get(key)
+            if pdf is not None:
+                self._reports.move_to_end(key)
+                return pdf
+        # Render outside the lock; two concurrent renders of the same report are harmless
+        pdf = render_pdf_report(summary)
+        with self._lock:
+            if key not in self._reports:
+                self._reports[key] = pdf
+                self._bytes += len(pdf)
+            while self._bytes > self.max_bytes and len(self._reports) > 1:
+                _, old = self._reports.popitem(last=False)
+                self._bytes -= len(old)
+        return pdf
+
+
+report_cache = ReportCache()
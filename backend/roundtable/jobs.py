@@ -0,0 +1,239 @@
+# Background jobs for the /api/agent-message roundtable
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Event, Lock
+import os
+import time
+import uuid
+
+import requests
+
+from common import http_client
+from common.resilience import BreakerRegistry, retry_call
+from common.tracing import tracer
+from roundtable.registry import agent_registry
+
+ROUNDTABLE_WORKERS = int(os.getenv('ROUNDTABLE_WORKERS', '4'))
+ROUNDTABLE_AGENT_TIMEOUT = float(os.getenv('ROUNDTABLE_AGENT_TIMEOUT', '30'))
+# Tries per agent hop when the runtime is unreachable or overloaded
+ROUNDTABLE_AGENT_ATTEMPTS = int(os.getenv('ROUNDTABLE_AGENT_ATTEMPTS', '3'))
+# An agent failing this many hops in a row is skipped for ROUNDTABLE_BREAKER_RESET_SECONDS
+ROUNDTABLE_BREAKER_FAILURES = int(os.getenv('ROUNDTABLE_BREAKER_FAILURES', '3'))
+ROUNDTABLE_BREAKER_RESET_SECONDS = float(os.getenv('ROUNDTABLE_BREAKER_RESET_SECONDS', '30'))
+MAX_JOBS = int(os.getenv('ROUNDTABLE_MAX_JOBS', '500'))
+# Finished jobs are kept this long so slow pollers can still read the result
+JOB_RETENTION_SECONDS = float(os.getenv('ROUNDTABLE_JOB_RETENTION_SECONDS', '600'))
+
+# Default roundtable order until an agent runtime has registered its own roster
+AGENT_NAMES = [
+    'PM-neutral',
+    'CTO-cautious',
+    'Investor-skeptical',
+    'Marketer-optimistic',
+    'CEO-supportive',
+]
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+
+# Shared by all jobs so a flapping agent is skipped across roundtables
+agent_breakers = BreakerRegistry(ROUNDTABLE_BREAKER_FAILURES, ROUNDTABLE_BREAKER_RESET_SECONDS)
+
+
+class RoundtableJob:
+    def __init__(self, sender, recipient, text, session_id=None, agents=None):
+        self.id = uuid.uuid4().hex
+        self.sender = sender
+        self.recipient = recipient
+        self.text = text
+        self.session_id = session_id
+        # Agent names to go through after the recipient (default: the registered default roster)
+        self.agents = agents or default_agents()
+        self.status = QUEUED
+        self.replies = []
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        # Trace of the request that created the job; its spans hang off it
+        self.trace = tracer.traceparent()
+        self._cancel = Event()
+        self._changed = Condition()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def _set_status(self, status):
+        with self._changed:
+            self.status = status
+            if self.finished:
+                self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def add_reply(self, reply):
+        with self._changed:
+            self.replies.append(reply)
+            self._changed.notify_all()
+
+    def since(self, cursor=0):
+        with self._changed:
+            return self.replies[cursor:], len(self.replies)
+
+    def wait(self, cursor, timeout=None):
+        # Blocks until there are replies past cursor or the job finishes
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self.replies) > cursor or self.finished, timeout)
+
+    def snapshot(self, cursor=0):
+        replies, next_cursor = self.since(cursor)
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'replies': replies,
+            'cursor': next_cursor,
+            'error': self.error,
+            'trace_id': self.trace_id,
+        }
+
+    @property
+    def trace_id(self):
+        return self.trace.split('-')[1] if self.trace else None
+
+
+def default_agents():
+    return agent_registry.default_roster() or AGENT_NAMES
+
+
+def agent_order(recipient, agents=AGENT_NAMES):
+    # Recipient first, then round robin through all other agents
+    return [recipient] + [name for name in agents if name != recipient]
+
+
+def _is_retryable(e):
+    # Read timeouts aren't retried: the agent may still be answering and
+    # publishing, and the LLM call behind it already retries on its own.
+    # NoRuntimeAvailable isn't either: it lasts until a runtime registers or passes a health check.
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code in (429, 502, 503, 504)
+    return isinstance(e, requests.ConnectionError)
+
+
+def ask_agent(agent_name, message, session_id=None):
+    # Each attempt goes to the least-loaded healthy replica, so a retry can land elsewhere
+    replica = agent_registry.acquire(agent_name)
+    ok = False
+    try:
+        # REST handlers on the runtime don't see headers, so the trace travels in the body
+        payload = {"agent": agent_name, "message": message, "session_id": session_id or "", "trace": tracer.traceparent()}
+        resp = http_client.post(f'{replica.address}/agent_message', pool='agents', json=payload,
+                                timeout=http_client.timeout(read=ROUNDTABLE_AGENT_TIMEOUT))
+        resp.raise_for_status()
+        ok = True
+        return resp.json().get('message', '')
+    finally:
+        agent_registry.release(replica, ok)
+
+
+def run_roundtable(job, on_reply=None):
+    """
+    Sends the message to each agent in turn; every agent gets the last
+    successful reply. Unreachable agents are retried with backoff, and an
+    agent that fails (or whose circuit is open) is skipped rather than
+    ending the roundtable. Checks for cancellation between agents.
+    """
+    with tracer.span('roundtable', parent=job.trace, job_id=job.id, session_id=job.session_id):
+        _run_agents(job, on_reply)
+
+
+def _run_agents(job, on_reply):
+    job._set_status(RUNNING)
+    current_message = job.text
+    answered = 0
+    for agent_name in agent_order(job.recipient, job.agents):
+        if job.cancelled:
+            job._set_status(CANCELLED)
+            return
+        breaker = agent_breakers.get(agent_name)
+        if not breaker.allow():
+            job.add_reply({'from': agent_name, 'reply': '[Skipped: agent unavailable]', 'skipped': True})
+            continue
+        try:
+            with tracer.span('agent_turn', agent=agent_name):
+                agent_reply = retry_call(lambda: ask_agent(agent_name, current_message, job.session_id),
+                                         _is_retryable, attempts=ROUNDTABLE_AGENT_ATTEMPTS)
+        except Exception as e:
+            breaker.record_failure()
+            print(f"[DEBUG] Error contacting agent {agent_name}: {e}")
+            job.add_reply({'from': agent_name, 'reply': f'[Error: {e}]'})
+            job.error = str(e)
+            continue
+        breaker.record_success()
+        answered += 1
+        reply = {'from': agent_name, 'reply': agent_reply}
+        job.add_reply(reply)
+        if on_reply is not None:
+            on_reply(job, reply)
+        # The next agent gets the previous agent's reply
+        current_message = agent_reply
+    if job.cancelled:
+        job._set_status(CANCELLED)
+    else:
+        # Only a roundtable where nobody answered counts as failed
+        job._set_status(DONE if answered else FAILED)
+
+
+class JobManager:
+    """
+    Runs roundtables on a bounded worker pool and keeps a bounded registry
+    of jobs for polling/streaming.
+    """
+
+    def __init__(self, workers=ROUNDTABLE_WORKERS, max_jobs=MAX_JOBS, retention=JOB_RETENTION_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='roundtable')
+        self._jobs = OrderedDict()
+        self._lock = Lock()
+        self.max_jobs = max_jobs
+        self.retention = retention
+
+    def _evict(self, now):
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            too_many = len(self._jobs) > self.max_jobs
+            expired = job.finished and now - job.finished_at > self.retention
+            if expired or (too_many and job.finished):
+                del self._jobs[job_id]
+
+    def submit(self, job, on_reply=None):
+        with self._lock:
+            self._evict(time.time())
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, on_reply)
+        return job
+
+    def _run(self, job, on_reply):
+        try:
+            if job.cancelled:
+                job._set_status(CANCELLED)
+                return
+            run_roundtable(job, on_reply)
+        except Exception as e:
+            job.error = str(e)
+            job._set_status(FAILED)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job._cancel.set()
+        # Jobs still waiting for a worker never start
+        if job.future is not None and job.future.cancel():
+            job._set_status(CANCELLED)
+        return job
@@ -0,0 +1,194 @@
+# Registry of agent runtime replicas with health checks and least-loaded routing
+from collections import OrderedDict
+from threading import Lock, Thread
+import os
+import time
+
+from common import http_client
+
+# Runtimes known before any registration arrives (comma separated)
+AGENT_RUNTIME_URLS = os.getenv('AGENT_RUNTIME_URLS', os.getenv('AGENTS_RUNTIME_URL', 'http://127.0.0.1:8000'))
+AGENT_HEALTH_INTERVAL = float(os.getenv('AGENT_HEALTH_INTERVAL', '10'))
+# Registrations not refreshed by a heartbeat or health check for this long are dropped
+AGENT_REGISTRATION_TTL = float(os.getenv('AGENT_REGISTRATION_TTL', '60'))
+# Consecutive failed turns that take a runtime out of rotation until its next good health check
+AGENT_MAX_FAILURES = int(os.getenv('AGENT_MAX_FAILURES', '3'))
+DEFAULT_CAPACITY = 4
+
+
+class NoRuntimeAvailable(Exception):
+    def __init__(self, name):
+        super().__init__(f"no healthy agent runtime available for {name}")
+        self.name = name
+
+
+class Replica:
+    # One agent (role/personality) served by one runtime address
+    def __init__(self, role, personality, address, capacity=DEFAULT_CAPACITY, default=False):
+        self.name = f"{role}-{personality}"
+        self.role = role
+        self.personality = personality
+        self.address = address
+        self.capacity = max(int(capacity or DEFAULT_CAPACITY), 1)
+        # Part of the runtime's default roster (the /api/agent-message roundtable order)
+        self.default = default
+        self.inflight = 0
+        self.last_seen = time.time()
+
+    @property
+    def load(self):
+        return self.inflight / self.capacity
+
+    def snapshot(self):
+        return {'agent': self.name, 'role': self.role, 'personality': self.personality, 'address': self.address,
+                'capacity': self.capacity, 'inflight': self.inflight, 'default': self.default}
+
+
+class Runtime:
+    def __init__(self, address, seed=False):
+        self.address = address
+        self.seed = seed
+        self.healthy = True
+        self.failures = 0
+        self.last_ok = time.time()
+
+
+class AgentRegistry:
+    """
+    Agent runtimes register the agents they host (role, personality,
+    capacity) under their address, by heartbeat or through their /health
+    answer. Each turn goes to the healthy replica of that agent with the
+    lowest inflight/capacity. A runtime that fails health checks or too
+    many turns in a row is taken out of rotation until it answers again.
+    """
+
+    def __init__(self, seeds=AGENT_RUNTIME_URLS, health_interval=AGENT_HEALTH_INTERVAL, ttl=AGENT_REGISTRATION_TTL):
+        self.health_interval = health_interval
+        self.ttl = ttl
+        self._replicas = OrderedDict()   # (name, address) -> Replica, in registration order
+        self._runtimes = {}
+        self._lock = Lock()
+        self._checker = None
+        for address in filter(None, (a.strip().rstrip('/') for a in seeds.split(','))):
+            self._runtimes[address] = Runtime(address, seed=True)
+
+    def register(self, address, agents):
+        """agents: [{'role', 'personality', 'capacity', 'default'}] hosted at address."""
+        address = address.rstrip('/')
+        now = time.time()
+        with self._lock:
+            runtime = self._runtimes.setdefault(address, Runtime(address))
+            runtime.last_ok = now
+            for a in agents:
+                replica = Replica(a['role'], a.get('personality') or 'neutral', address, a.get('capacity'), bool(a.get('default')))
+                existing = self._replicas.get((replica.name, address))
+                if existing is None:
+                    self._replicas[(replica.name, address)] = replica
+                else:
+                    existing.capacity, existing.default, existing.last_seen = replica.capacity, replica.default, now
+
+    def _expire(self, now):
+        for key, replica in list(self._replicas.items()):
+            if now - replica.last_seen > self.ttl:
+                del self._replicas[key]
+        for address, runtime in list(self._runtimes.items()):
+            if not runtime.seed and now - runtime.last_ok > self.ttl:
+                del self._runtimes[address]
+
+    def _healthy(self, address):
+        runtime = self._runtimes.get(address)
+        return runtime is not None and runtime.healthy
+
+    def default_roster(self):
+        # Names of the registered default-roster agents, in the order runtimes list them
+        with self._lock:
+            self._expire(time.time())
+            return list(OrderedDict.fromkeys(r.name for r in self._replicas.values() if r.default))
+
+    def acquire(self, name):
+        """
+        Picks the least-loaded healthy replica for agent `name` and counts
+        the turn against it. Raises NoRuntimeAvailable if no runtime is
+        healthy; unhealthy ones come back with their next good health check.
+        """
+        self.start()
+        with self._lock:
+            self._expire(time.time())
+            candidates = [r for (n, _), r in self._replicas.items() if n == name]
+            healthy = [r for r in candidates if self._healthy(r.address)]
+            if not healthy:
+                # Runtimes build any agent on demand, so a healthy runtime can take it on
+                addresses = [a for a, rt in self._runtimes.items() if rt.healthy]
+                role, _, personality = name.partition('-')
+                for address in addresses:
+                    if (name, address) not in self._replicas:
+                        self._replicas[(name, address)] = Replica(role, personality or 'neutral', address)
+                healthy = [self._replicas[(name, a)] for a in addresses]
+            if not healthy:
+                # No healthy runtime: none known, or all failing their turns/health checks
+                raise NoRuntimeAvailable(name)
+            replica = min(healthy, key=lambda r: (r.load, r.inflight))
+            replica.inflight += 1
+            return replica
+
+    def release(self, replica, ok=True):
+        with self._lock:
+            replica.inflight = max(replica.inflight - 1, 0)
+            runtime = self._runtimes.get(replica.address)
+            if runtime is None:
+                return
+            if ok:
+                runtime.failures = 0
+            else:
+                runtime.failures += 1
+                if runtime.failures >= AGENT_MAX_FAILURES:
+                    runtime.healthy = False
+
+    def check_health(self):
+        with self._lock:
+            addresses = list(self._runtimes)
+        for address in addresses:
+            try:
+                resp = http_client.get(f'{address}/health', pool='agents', timeout=http_client.timeout(read=5))
+                resp.raise_for_status()
+                agents = resp.json().get('agents') or []
+            except Exception as e:
+                with self._lock:
+                    runtime = self._runtimes.get(address)
+                    if runtime is not None and runtime.healthy:
+                        print(f"[WARN] Agent runtime {address} failed its health check: {e}")
+                        runtime.healthy = False
+                continue
+            self.register(address, agents)
+            with self._lock:
+                runtime = self._runtimes.get(address)
+                runtime.healthy, runtime.failures = True, 0
+
+    def start(self):
+        # Starts the background health checks (idempotent)
+        if self._checker is not None:
+            return
+        with self._lock:
+            if self._checker is None:
+                self._checker = Thread(target=self._check_loop, name='agent-health', daemon=True)
+                self._checker.start()
+
+    def _check_loop(self):
+        while True:
+            try:
+                self.check_health()
+            except Exception as e:
+                print(f"[WARN] Agent health check failed: {e}")
+            time.sleep(self.health_interval)
+
+    def snapshot(self):
+        with self._lock:
+            self._expire(time.time())
+            return {
+                'runtimes': [{'address': rt.address, 'healthy': rt.healthy, 'failures': rt.failures}
+                             for rt in self._runtimes.values()],
+                'agents': [r.snapshot() for r in self._replicas.values()],
+            }
+
+
+agent_registry = AgentRegistry()
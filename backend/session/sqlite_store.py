@@ -0,0 +1,271 @@
+# Session store shared by several worker processes through one SQLite (WAL) file
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Condition, RLock
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+from session.store import (
+    SESSION_TTL_SECONDS, MAX_SESSIONS, SESSION_MAX_COMMENTS, SESSION_MAX_TRANSCRIPT,
+    SESSION_MAX_ARTIFACTS, MAX_COMMENT_CHARS, DEFAULT_SESSION_ID,
+)
+from session.transcript import Transcript
+
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'sessions.sqlite3'))
+# How often feed waiters look for comments written by other processes
+FEED_POLL_SECONDS = float(os.getenv('FEED_POLL_SECONDS', '0.25'))
+# last_seen is only rewritten when it is older than this, so feed polling stays read-only
+TOUCH_INTERVAL_SECONDS = 5.0
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS sessions ('
+    'id TEXT PRIMARY KEY, agents TEXT NOT NULL, idea TEXT, last_seq INTEGER NOT NULL DEFAULT 0, '
+    'created REAL NOT NULL, last_seen REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions(last_seen)',
+    'CREATE TABLE IF NOT EXISTS comments ('
+    'session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE, seq INTEGER NOT NULL, '
+    'body TEXT NOT NULL, PRIMARY KEY (session_id, seq))',
+    'CREATE TABLE IF NOT EXISTS transcript ('
+    'session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE, seq INTEGER NOT NULL, '
+    'sender TEXT, text TEXT, PRIMARY KEY (session_id, seq))',
+    'CREATE TABLE IF NOT EXISTS artifacts ('
+    'session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE, name TEXT NOT NULL, '
+    'value TEXT NOT NULL, updated REAL NOT NULL, PRIMARY KEY (session_id, name))',
+)
+
+
+class SqliteFeed:
+    """Same interface as CommentFeed, backed by the comments table."""
+
+    def __init__(self, store, session_id):
+        self._store = store
+        self.session_id = session_id
+
+    def since(self, cursor=0, limit=None):
+        with self._store._db() as db:
+            last_seq = self._last_seq(db)
+            if cursor > last_seq:
+                # Cursor from before the session was evicted/recreated: replay what we have
+                cursor = 0
+            rows = db.execute(
+                'SELECT body FROM comments WHERE session_id = ? AND seq > ? ORDER BY seq LIMIT ?',
+                (self.session_id, cursor, -1 if limit is None else limit),
+            ).fetchall()
+        newer = [json.loads(body) for (body,) in rows]
+        next_cursor = newer[-1]['seq'] if newer else max(cursor, 0)
+        return newer, next_cursor
+
+    def _last_seq(self, db):
+        row = db.execute('SELECT last_seq FROM sessions WHERE id = ?', (self.session_id,)).fetchone()
+        return row[0] if row else 0
+
+    def wait_for(self, cursor, timeout=None):
+        """
+        Blocks until there is a comment newer than cursor or the timeout
+        expires. Local appends wake waiters immediately; appends from other
+        processes are noticed within FEED_POLL_SECONDS.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            last_seq = self.last_seq
+            if last_seq > cursor or (cursor > last_seq and len(self) > 0):
+                return True
+            remaining = FEED_POLL_SECONDS if deadline is None else min(FEED_POLL_SECONDS, deadline - time.monotonic())
+            if remaining <= 0:
+                return False
+            with self._store._appended:
+                self._store._appended.wait(remaining)
+
+    @property
+    def last_seq(self):
+        with self._store._db() as db:
+            return self._last_seq(db)
+
+    def __len__(self):
+        with self._store._db() as db:
+            return db.execute('SELECT COUNT(*) FROM comments WHERE session_id = ?', (self.session_id,)).fetchone()[0]
+
+
+class SqliteSession:
+    def __init__(self, store, session_id, agents=None, idea=None, created_at=None, last_seen=None):
+        self._store = store
+        self.id = session_id
+        self.agents = agents or []
+        self.idea = idea
+        self.feed = SqliteFeed(store, session_id)
+        self.created_at = created_at or time.time()
+        self.last_seen = last_seen or self.created_at
+
+    def add_comment(self, comment):
+        comment = dict(comment)
+        if isinstance(comment.get('message'), str):
+            comment['message'] = comment['message'][:MAX_COMMENT_CHARS]
+        with self._store._transaction() as db:
+            if db.execute('UPDATE sessions SET last_seq = last_seq + 1 WHERE id = ?', (self.id,)).rowcount == 0:
+                # Another worker evicted the session since it was loaded: recreate it, as get_or_create would
+                now = time.time()
+                db.execute('INSERT INTO sessions (id, agents, idea, last_seq, created, last_seen) VALUES (?, ?, ?, 1, ?, ?)',
+                           (self.id, json.dumps(self.agents), self.idea, now, now))
+            seq = db.execute('SELECT last_seq FROM sessions WHERE id = ?', (self.id,)).fetchone()[0]
+            entry = dict(comment, seq=seq)
+            db.execute('INSERT INTO comments (session_id, seq, body) VALUES (?, ?, ?)', (self.id, seq, json.dumps(entry)))
+            db.execute('DELETE FROM comments WHERE session_id = ? AND seq <= ?', (self.id, seq - SESSION_MAX_COMMENTS))
+            if not comment.get('partial'):
+                # Streamed deltas are for live display only; the final comment carries the full text
+                db.execute('INSERT INTO transcript (session_id, seq, sender, text) VALUES (?, ?, ?, ?)',
+                           (self.id, seq, entry.get('agent'), entry.get('message')))
+                db.execute(
+                    'DELETE FROM transcript WHERE session_id = ? AND seq NOT IN '
+                    '(SELECT seq FROM transcript WHERE session_id = ? ORDER BY seq DESC LIMIT ?)',
+                    (self.id, self.id, SESSION_MAX_TRANSCRIPT),
+                )
+        with self._store._appended:
+            self._store._appended.notify_all()
+        return entry
+
+    @property
+    def transcript(self):
+        return self._store._transcript(self.id)
+
+    def messages(self, version=None):
+        return self.transcript.messages(version)
+
+    def set_artifact(self, name, value):
+        with self._store._transaction() as db:
+            db.execute('INSERT OR REPLACE INTO artifacts (session_id, name, value, updated) VALUES (?, ?, ?, ?)',
+                       (self.id, name, json.dumps(value), time.time()))
+            db.execute(
+                'DELETE FROM artifacts WHERE session_id = ? AND name NOT IN '
+                '(SELECT name FROM artifacts WHERE session_id = ? ORDER BY updated DESC LIMIT ?)',
+                (self.id, self.id, SESSION_MAX_ARTIFACTS),
+            )
+
+    def get_artifact(self, name):
+        with self._store._db() as db:
+            row = db.execute('SELECT value FROM artifacts WHERE session_id = ? AND name = ?', (self.id, name)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class SqliteSessionStore:
+    """
+    Drop-in replacement for SessionStore whose sessions, feeds, transcripts
+    and artifacts live in a SQLite database in WAL mode, so every worker
+    process pointed at the same file sees the same sessions. Eviction
+    follows the same idle TTL and LRU limit as the in-memory store.
+    """
+
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL_SECONDS, max_sessions=MAX_SESSIONS):
+        self.path = path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._conn = None
+        self._pid = None
+        self._lock = RLock()
+        # Wakes this process's feed waiters on local appends
+        self._appended = Condition()
+        # Per-process copies of session transcripts, topped up from the database on access
+        self._transcripts = OrderedDict()
+
+    @contextmanager
+    def _db(self):
+        with self._lock:
+            # Reconnect after a fork: SQLite connections must not cross processes
+            if self._conn is None or self._pid != os.getpid():
+                if self.path != ':memory:':
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+                self._conn.execute('PRAGMA foreign_keys=ON')
+                for statement in SCHEMA:
+                    self._conn.execute(statement)
+                self._pid = os.getpid()
+            yield self._conn
+
+    @contextmanager
+    def _transaction(self):
+        with self._db() as db:
+            # IMMEDIATE takes the write lock up front so concurrent writers queue instead of deadlocking
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    def _transcript(self, session_id):
+        with self._db() as db:
+            transcript = self._transcripts.get(session_id)
+            last_seq = db.execute('SELECT last_seq FROM sessions WHERE id = ?', (session_id,)).fetchone()
+            if transcript is None or last_seq is None or last_seq[0] < transcript.version:
+                # First access, or the session was evicted and recreated since
+                transcript = self._transcripts[session_id] = Transcript(maxlen=SESSION_MAX_TRANSCRIPT)
+            self._transcripts.move_to_end(session_id)
+            while len(self._transcripts) > self.max_sessions:
+                self._transcripts.popitem(last=False)
+            rows = db.execute(
+                'SELECT seq, sender, text FROM transcript WHERE session_id = ? AND seq > ? ORDER BY seq',
+                (session_id, transcript.version),
+            ).fetchall()
+            for seq, sender, text in rows:
+                transcript.append(seq, sender, text)
+            return transcript
+
+    def _evict(self, db, now):
+        db.execute('DELETE FROM sessions WHERE last_seen < ?', (now - self.ttl,))
+        db.execute(
+            'DELETE FROM sessions WHERE id NOT IN (SELECT id FROM sessions ORDER BY last_seen DESC LIMIT ?)',
+            (self.max_sessions,),
+        )
+
+    def _session(self, row):
+        session_id, agents, idea, created, last_seen = row
+        return SqliteSession(self, session_id, json.loads(agents), idea, created, last_seen)
+
+    def create(self, agents=None, idea=None):
+        now = time.time()
+        session = SqliteSession(self, uuid.uuid4().hex, agents=agents, idea=idea, created_at=now)
+        with self._transaction() as db:
+            db.execute('INSERT INTO sessions (id, agents, idea, created, last_seen) VALUES (?, ?, ?, ?, ?)',
+                       (session.id, json.dumps(session.agents), idea, now, now))
+            self._evict(db, now)
+        return session
+
+    def get(self, session_id):
+        now = time.time()
+        with self._db() as db:
+            row = db.execute('SELECT id, agents, idea, created, last_seen FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        if row is None or now - row[4] > self.ttl:
+            return None
+        if now - row[4] > TOUCH_INTERVAL_SECONDS:
+            with self._transaction() as db:
+                db.execute('UPDATE sessions SET last_seen = ? WHERE id = ?', (now, session_id))
+                self._evict(db, now)
+        return self._session(row)
+
+    def get_or_create(self, session_id):
+        # Used by comment ingestion: agents may outlive the session they were started for
+        now = time.time()
+        session_id = session_id or DEFAULT_SESSION_ID
+        with self._transaction() as db:
+            db.execute('INSERT OR IGNORE INTO sessions (id, agents, created, last_seen) VALUES (?, ?, ?, ?)',
+                       (session_id, '[]', now, now))
+            db.execute('UPDATE sessions SET last_seen = ? WHERE id = ?', (now, session_id))
+            self._evict(db, now)
+            row = db.execute('SELECT id, agents, idea, created, last_seen FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        return self._session(row)
+
+    def feed_sizes(self):
+        # (session count, retained feed comments, transcript messages) for metrics
+        with self._db() as db:
+            return tuple(db.execute(
+                'SELECT (SELECT COUNT(*) FROM sessions), (SELECT COUNT(*) FROM comments), (SELECT COUNT(*) FROM transcript)'
+            ).fetchone())
+
+    def __len__(self):
+        with self._db() as db:
+            return db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
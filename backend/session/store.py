@@ -0,0 +1,140 @@
+# In-memory session registry with per-session caps, idle TTL and an LRU limit
+from collections import OrderedDict
+from threading import Lock
+import os
+import time
+import uuid
+
+from feed.comment_feed import CommentFeed
+from session.transcript import Transcript
+
+SESSION_TTL_SECONDS = float(os.getenv('SESSION_TTL_SECONDS', '3600'))
+MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', '200'))
+SESSION_MAX_COMMENTS = int(os.getenv('SESSION_MAX_COMMENTS', '500'))
+SESSION_MAX_TRANSCRIPT = int(os.getenv('SESSION_MAX_TRANSCRIPT', '500'))
+SESSION_MAX_ARTIFACTS = int(os.getenv('SESSION_MAX_ARTIFACTS', '16'))
+MAX_COMMENT_CHARS = int(os.getenv('MAX_COMMENT_CHARS', '8000'))
+# 'memory' keeps sessions in this process; 'sqlite' shares them between worker processes
+SESSION_STORE = os.getenv('SESSION_STORE', 'memory')
+
+# Comments posted without a session id (old agent runners, scripts) land here
+DEFAULT_SESSION_ID = 'default'
+
+
+class Session:
+    def __init__(self, session_id, agents=None, idea=None):
+        self.id = session_id
+        self.agents = agents or []
+        self.idea = idea
+        self.feed = CommentFeed(maxlen=SESSION_MAX_COMMENTS)
+        self.transcript = Transcript(maxlen=SESSION_MAX_TRANSCRIPT)
+        self.artifacts = OrderedDict()
+        self._lock = Lock()
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+
+    def add_comment(self, comment):
+        comment = dict(comment)
+        if isinstance(comment.get('message'), str):
+            comment['message'] = comment['message'][:MAX_COMMENT_CHARS]
+        # One lock across both appends so the transcript gets messages in feed seq order
+        with self._lock:
+            entry = self.feed.append(comment)
+            if comment.get('partial'):
+                # Streamed deltas are for live display only; the final comment carries the full text
+                return entry
+            self.transcript.append(entry['seq'], entry.get('agent'), entry.get('message'))
+        return entry
+
+    def messages(self, version=None):
+        return self.transcript.messages(version)
+
+    def set_artifact(self, name, value):
+        with self._lock:
+            self.artifacts[name] = value
+            self.artifacts.move_to_end(name)
+            while len(self.artifacts) > SESSION_MAX_ARTIFACTS:
+                self.artifacts.popitem(last=False)
+
+    def get_artifact(self, name):
+        with self._lock:
+            return self.artifacts.get(name)
+
+
+class SessionStore:
+    """
+    Sessions are kept in least-recently-used order, so expired and
+    overflowing sessions are always at the front of the dict and eviction
+    only touches the sessions it actually removes.
+    """
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = Lock()
+
+    def _evict(self, now):
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_seen <= self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def _touch(self, session, now):
+        session.last_seen = now
+        self._sessions.move_to_end(session.id)
+
+    def create(self, agents=None, idea=None):
+        now = time.time()
+        session = Session(uuid.uuid4().hex, agents=agents, idea=idea)
+        with self._lock:
+            self._sessions[session.id] = session
+            self._evict(now)
+        return session
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._touch(session, now)
+            return session
+
+    def get_or_create(self, session_id):
+        # Used by comment ingestion: agents may outlive the session they were started for
+        now = time.time()
+        session_id = session_id or DEFAULT_SESSION_ID
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id)
+                self._sessions[session_id] = session
+            self._touch(session, now)
+            self._evict(now)
+            return session
+
+    def feed_sizes(self):
+        # (session count, retained feed comments, transcript messages) for metrics
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return len(sessions), sum(len(s.feed) for s in sessions), sum(len(s.transcript) for s in sessions)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+def make_session_store():
+    """
+    Builds the store selected by SESSION_STORE. Both kinds expose the same
+    create/get/get_or_create/feed_sizes interface, and their sessions the
+    same feed/add_comment/messages/artifact methods.
+    """
+    if SESSION_STORE == 'sqlite':
+        from session.sqlite_store import SqliteSessionStore
+        return SqliteSessionStore()
+    if SESSION_STORE != 'memory':
+        print(f"[WARN] Unknown SESSION_STORE={SESSION_STORE!r}, using the in-memory store")
+    return SessionStore()
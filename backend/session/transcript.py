@@ -0,0 +1,80 @@
+# Session transcript with its rendered prompt text maintained incrementally
+from collections import deque
+from threading import Lock
+
+from summarizer.compaction import estimate_tokens
+
+
+def render_line(sender, text):
+    return f"{sender}: {text}"
+
+
+class Transcript:
+    """
+    Bounded list of (seq, sender, text) messages. 'seq' is the feed seq of
+    the comment the message came from and doubles as the transcript
+    version: a client that has seen the feed up to seq N can ask for the
+    transcript as of version N.
+
+    The "sender: text" rendering used in prompts is kept as one string and
+    only extended with what was appended (and trimmed by what fell off the
+    front) since the last render, so building a prompt doesn't re-render
+    the whole conversation each time.
+    """
+
+    def __init__(self, maxlen):
+        self._messages = deque(maxlen=maxlen)
+        self._lock = Lock()
+        self.version = 0
+        self.tokens = 0            # estimate for the whole rendering, as compaction counts it
+        self._text = ''
+        self._rendered = 0         # messages at the front already included in _text
+        self._pending = []         # lines appended since the last render
+        self._drop_chars = 0       # chars of evicted lines still at the front of _text
+
+    def append(self, seq, sender, text):
+        line = render_line(sender, text)
+        with self._lock:
+            if len(self._messages) == self._messages.maxlen:
+                evicted = self._messages[0][3]
+                self.tokens -= estimate_tokens(evicted) + 1
+                if self._rendered:
+                    self._drop_chars += len(evicted) + 1
+                    self._rendered -= 1
+                else:
+                    self._pending.pop(0)
+            self._messages.append((seq, sender, text, line))
+            self._pending.append(line)
+            self.tokens += estimate_tokens(line) + 1
+            # Never goes backwards, even if a caller appends out of order
+            self.version = max(self.version, seq)
+
+    def _select(self, version):
+        if version is None or version >= self.version:
+            return list(self._messages)
+        return [m for m in self._messages if m[0] <= version]
+
+    def messages(self, version=None):
+        with self._lock:
+            # 'seq' lets compaction track what it already folded while old messages are evicted
+            return [{'seq': seq, 'sender': sender, 'text': text} for seq, sender, text, _ in self._select(version)]
+
+    def render(self, version=None):
+        """Returns (text, token estimate) for the transcript as of version (default: latest)."""
+        with self._lock:
+            if version is not None and version < self.version:
+                selected = self._select(version)
+                return "\n".join(m[3] for m in selected), sum(estimate_tokens(m[3]) + 1 for m in selected)
+            if self._drop_chars:
+                self._text = self._text[self._drop_chars:]
+                self._drop_chars = 0
+            if self._pending:
+                new = "\n".join(self._pending)
+                self._text = self._text + "\n" + new if self._rendered else new
+                self._rendered += len(self._pending)
+                self._pending = []
+            return self._text, self.tokens
+
+    def __len__(self):
+        with self._lock:
+            return len(self._messages)
@@ -0,0 +1,117 @@
+# Content-addressed cache for Gemini outputs: in-memory LRU in front of a SQLite tier
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import os
+import sqlite3
+import time
+
+GEMINI_CACHE_ENABLED = os.getenv('GEMINI_CACHE', '1') == '1'
+GEMINI_CACHE_PATH = os.getenv('GEMINI_CACHE_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'gemini_cache.sqlite3'))
+GEMINI_CACHE_MEMORY_ENTRIES = int(os.getenv('GEMINI_CACHE_MEMORY_ENTRIES', '256'))
+GEMINI_CACHE_DISK_BYTES = int(os.getenv('GEMINI_CACHE_DISK_BYTES', str(64 * 1024 * 1024)))
+GEMINI_CACHE_TTL_SECONDS = float(os.getenv('GEMINI_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+
+
+def make_key(template, model, transcript):
+    h = hashlib.sha256()
+    for part in (template, model, transcript):
+        data = part.encode('utf-8')
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+        h.update(len(data).to_bytes(8, 'big'))
+        h.update(data)
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    def __init__(self, path=GEMINI_CACHE_PATH, memory_entries=GEMINI_CACHE_MEMORY_ENTRIES,
+                 disk_bytes=GEMINI_CACHE_DISK_BYTES, ttl=GEMINI_CACHE_TTL_SECONDS):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (value, created)
+        self._lock = Lock()
+        self._db = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0}
+
+    def _conn(self):
+        # Opened lazily so importing the module never touches the disk
+        if self._db is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                'created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)')
+        return self._db
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None and now - hit[1] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return hit[0]
+            self._memory.pop(key, None)
+            db = self._conn()
+            row = db.execute('SELECT value, created FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+                db.commit()
+                self._remember(key, row[0], row[1])
+                self.stats['disk_hits'] += 1
+                return row[0]
+            if row is not None:
+                db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                db.commit()
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            self._remember(key, value, now)
+            db = self._conn()
+            db.execute('INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                       (key, value, size, now, now))
+            self._evict_disk(db, now)
+            db.commit()
+            self.stats['sets'] += 1
+
+    def _evict_disk(self, db, now):
+        expired = db.execute('DELETE FROM entries WHERE created < ?', (now - self.ttl,)).rowcount
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        evicted = max(expired, 0)
+        if total > self.disk_bytes:
+            # Drop least recently used rows until we are back under the byte budget
+            for key, size in db.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall():
+                if total <= self.disk_bytes:
+                    break
+                db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                total -= size
+                evicted += 1
+        self.stats['evictions'] += evicted
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+gemini_cache = ArtifactCache()
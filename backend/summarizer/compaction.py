@@ -0,0 +1,133 @@
+# Token-budgeted transcript compaction with rolling, per-session summaries
+from collections import OrderedDict
+from bisect import bisect_right
+from threading import Lock
+import hashlib
+import os
+
+GEMINI_PROMPT_TOKEN_BUDGET = int(os.getenv('GEMINI_PROMPT_TOKEN_BUDGET', '6000'))
+# Share of the budget reserved for the rolling summary of older messages
+ROLLING_SUMMARY_TOKENS = int(os.getenv('ROLLING_SUMMARY_TOKENS', '800'))
+# How much older transcript is folded into the summary per Gemini call
+FOLD_CHUNK_TOKENS = int(os.getenv('FOLD_CHUNK_TOKENS', '2000'))
+MAX_ROLLING_SUMMARIES = int(os.getenv('MAX_ROLLING_SUMMARIES', '200'))
+
+SUMMARY_SENDER = 'Earlier discussion (summary)'
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for English prompts and needs no tokenizer
+    return len(text) // 4 + 1
+
+
+def _line(m):
+    return f"{m['sender']}: {m['text']}"
+
+
+def _fingerprint(messages):
+    h = hashlib.sha256()
+    for m in messages:
+        h.update(_line(m).encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+class RollingSummary:
+    def __init__(self):
+        self.reset()
+        self.lock = Lock()
+
+    def reset(self):
+        self.folded = 0        # number of leading messages already folded into text
+        self.fingerprint = _fingerprint([])
+        # For session transcripts (messages carry their feed 'seq'): the last folded
+        # message, so the summary stays valid while old messages are evicted
+        self.last_seq = None
+        self.last_fingerprint = None
+        self.text = ''
+
+    def unfolded_start(self, messages, seqs):
+        """Index of the first message not yet folded; resets the summary if it doesn't match."""
+        if seqs is None:
+            # Plain message lists: valid only if they still start with what was folded
+            if self.folded > len(messages) or _fingerprint(messages[:self.folded]) != self.fingerprint:
+                self.reset()
+            return self.folded
+        if self.last_seq is None:
+            return 0
+        start = bisect_right(seqs, self.last_seq)
+        if seqs[-1] < self.last_seq or (start and seqs[start - 1] == self.last_seq
+                                        and _fingerprint(messages[start - 1:start]) != self.last_fingerprint):
+            # Session recreated since (seqs went backwards or differ): start over
+            self.reset()
+            return 0
+        return start
+
+    def mark_folded(self, messages, seqs, end):
+        if seqs is None:
+            self.folded = end
+            self.fingerprint = _fingerprint(messages[:end])
+        else:
+            self.last_seq = seqs[end - 1]
+            self.last_fingerprint = _fingerprint(messages[end - 1:end])
+
+
+_summaries = OrderedDict()
+_summaries_lock = Lock()
+
+
+def _state_for(key):
+    with _summaries_lock:
+        state = _summaries.get(key)
+        if state is None:
+            state = RollingSummary()
+            _summaries[key] = state
+        _summaries.move_to_end(key)
+        while len(_summaries) > MAX_ROLLING_SUMMARIES:
+            _summaries.popitem(last=False)
+        return state
+
+
+def _truncate(text, tokens):
+    max_chars = tokens * 4
+    return text if len(text) <= max_chars else text[:max_chars] + '...'
+
+
+def compact_transcript(messages, budget, fold, session_id=None):
+    """
+    Returns messages that fit in roughly `budget` tokens. The most recent
+    messages are kept verbatim; older ones are folded, a chunk at a time,
+    into a rolling summary that is cached per session and only extended
+    when the verbatim tail outgrows its share of the budget.
+
+    fold(previous_summary, messages) -> new summary text
+    """
+    lines_tokens = [estimate_tokens(_line(m)) + 1 for m in messages]
+    if sum(lines_tokens) <= budget:
+        return messages
+
+    tail_budget = max(budget - ROLLING_SUMMARY_TOKENS, 1)
+    key = session_id or _fingerprint(messages[:1])
+    # Session transcripts are tracked by seq: eviction from the front doesn't invalidate the summary
+    seqs = [m['seq'] for m in messages] if all(m.get('seq') is not None for m in messages) else None
+    state = _state_for(key)
+    with state.lock:
+        folded = state.unfolded_start(messages, seqs)
+        tail_tokens = sum(lines_tokens[folded:])
+        while tail_tokens > tail_budget and folded < len(messages):
+            start = end = folded
+            chunk_tokens = 0
+            while end < len(messages) and (end == start or chunk_tokens + lines_tokens[end] <= FOLD_CHUNK_TOKENS):
+                chunk_tokens += lines_tokens[end]
+                end += 1
+            state.text = _truncate(fold(state.text, messages[start:end]), ROLLING_SUMMARY_TOKENS)
+            state.mark_folded(messages, seqs, end)
+            folded = end
+            tail_tokens -= chunk_tokens
+
+        summary = state.text
+
+    compacted = list(messages[folded:])
+    if summary:
+        compacted.insert(0, {'sender': SUMMARY_SENDER, 'text': summary})
+    return compacted
@@ -1,12 +1,124 @@
 # Gemini 2.0 Flash API integration for summarization
 import os
-import requests
+import time
+from common import http_client
+from common.governor import get_governor, request_key
+from common.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, LLM_ERRORS
+from common.tracing import tracer
+from summarizer.cache import gemini_cache, make_key, GEMINI_CACHE_ENABLED
+from summarizer.compaction import compact_transcript, estimate_tokens, GEMINI_PROMPT_TOKEN_BUDGET
+from session.transcript import Transcript
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+# Point GEMINI_API_BASE at bench/stub_llm.py to run without a real key
+GEMINI_API_BASE = os.getenv('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com')
+GEMINI_API_URL = f"{GEMINI_API_BASE}/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
+GEMINI_TIMEOUT = http_client.timeout(read=float(os.getenv('GEMINI_READ_TIMEOUT', '90')))
+# GEMINI_MAX_CONCURRENCY / GEMINI_RATE_PER_SEC / GEMINI_BURST
+gemini_governor = get_governor('gemini')
 
 
-def summarize_conversation(messages):
+def _generate(prompt, artifact='unknown'):
+    """
+    Sends one prompt to Gemini and returns the raw JSON response. Calls
+    queue for a concurrency slot and rate-limit token, and identical
+    prompts already in flight share that request instead of sending
+    their own.
+    """
+    # The span includes the wait for a slot, the http span inside it only the request
+    with tracer.span('gemini.generate', artifact=artifact):
+        return gemini_governor.call(request_key(GEMINI_MODEL, prompt), lambda: _post_prompt(prompt, artifact))
+
+
+def _post_prompt(prompt, artifact):
+    headers = {"Content-Type": "application/json"}
+    payload = {
+        "contents": [{
+            "parts": [{"text": prompt}]
+        }]
+    }
+    labels = {'provider': 'gemini', 'agent': '', 'artifact': artifact}
+    started = time.perf_counter()
+    try:
+        response = http_client.post(GEMINI_API_URL, pool='gemini', headers=headers, json=payload, timeout=GEMINI_TIMEOUT)
+        response.raise_for_status()
+    except Exception as e:
+        status = getattr(getattr(e, 'response', None), 'status_code', None)
+        LLM_ERRORS.inc(reason=str(status) if status else type(e).__name__, **labels)
+        raise
+    LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+    data = response.json()
+    usage = data.get('usageMetadata') or {}
+    LLM_TOKENS.inc(usage.get('promptTokenCount', 0), kind='prompt', **labels)
+    LLM_TOKENS.inc(usage.get('candidatesTokenCount', 0), kind='completion', **labels)
+    return data
+
+
+def render_transcript(messages):
+    return "\n".join([f"{m['sender']}: {m['text']}" for m in messages])
+
+
+FOLD_TEMPLATE = (
+    "You maintain a running summary of a startup planning conversation between AI agents.\n"
+    "Update the summary below with the new messages. Keep every decision, number, risk and open question; "
+    "drop small talk. Reply with the updated summary only, in under 400 words.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New messages:\n"
+)
+
+
+def _fold_summary(previous_summary, messages):
+    # Used by compaction to fold older transcript chunks into the rolling summary
+    data = _generate(FOLD_TEMPLATE.format(summary=previous_summary or "(none yet)") + render_transcript(messages), 'fold')
+    if not data.get('candidates'):
+        return previous_summary
+    return data['candidates'][0]['content']['parts'][0]['text']
+
+
+def _generate_text(template, messages, empty_text, session_id=None, artifact='unknown'):
+    """
+    Renders template + transcript and returns Gemini's text. messages is
+    a list of {'sender', 'text'} or a session Transcript, whose cached
+    rendering is used as is when it fits. Long transcripts are compacted so
+    the prompt stays within GEMINI_PROMPT_TOKEN_BUDGET. Results are cached
+    by (template, model, transcript), so asking again for the same artifact
+    of an unchanged conversation never reaches the API.
+    """
+    with tracer.span('gemini.artifact', artifact=artifact) as span:
+        return _artifact_text(template, messages, empty_text, session_id, artifact, span)
+
+
+def _artifact_text(template, messages, empty_text, session_id, artifact, span):
+    # Keyed on the full transcript: compaction depends on the rolling summary so far
+    if isinstance(messages, Transcript):
+        transcript, tokens = messages.render()
+    else:
+        transcript = render_transcript(messages)
+        tokens = estimate_tokens(transcript)
+    key = make_key(template, GEMINI_MODEL, transcript)
+    if GEMINI_CACHE_ENABLED:
+        cached = gemini_cache.get(key)
+        if span is not None:
+            span.set(cached=cached is not None)
+        if cached is not None:
+            return cached
+    budget = GEMINI_PROMPT_TOKEN_BUDGET - estimate_tokens(template)
+    if tokens > budget:
+        if isinstance(messages, Transcript):
+            messages = messages.messages()
+        transcript = render_transcript(compact_transcript(messages, budget, _fold_summary, session_id))
+    data = _generate(template + transcript, artifact)
+    if not data.get('candidates'):
+        # Don't cache empty answers, the next attempt may succeed
+        return empty_text
+    text = data['candidates'][0]['content']['parts'][0]['text']
+    if GEMINI_CACHE_ENABLED:
+        gemini_cache.set(key, text)
+    return text
+
+
+def summarize_conversation(messages, session_id=None):
     """
     Summarize a list of messages using Gemini 2.0 Flash API.
     messages: list of dicts with 'sender' and 'text'
@@ -14,7 +126,7 @@ def summarize_conversation(messages):
     """
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY not set!")
-    prompt = """Create a comprehensive 'Executive Brief' of this startup planning conversation that includes:
+    template = """Create a comprehensive 'Executive Brief' of this startup planning conversation that includes:
 
 1. 📋 OVERVIEW:
    - Summarize the startup concept in 2-3 sentences
@@ -61,25 +173,15 @@ BE THOROUGH BUT CONCISE, FOCUSING ON ACTIONABLE BUSINESS INTELLIGENCE.
 USE PROFESSIONAL EXECUTIVE SUMMARY LANGUAGE.
 
 Conversation transcript:
-""" + "\n".join([f"{m['sender']}: {m['text']}" for m in messages])
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
-    }
-    response = requests.post(GEMINI_API_URL, headers=headers, json=payload)
-    response.raise_for_status()
-    data = response.json()
-    # Extract summary from Gemini response
-    return data['candidates'][0]['content']['parts'][0]['text'] if data.get('candidates') else "No summary returned."
+"""
+    return _generate_text(template, messages, "No summary returned.", session_id, 'summary')
 
 
-def create_pitch_deck(messages):
+def create_pitch_deck(messages, session_id=None):
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY not set!")
     # Directly generate slides without asking for more details
-    prompt = (
+    template = (
         "Generate a concise, investor-focused 7-slide pitch deck based on the following conversation between AI agents. "
         "Do not ask for additional details; use only the provided conversation. "
         "For each slide, use the format:\n"
@@ -88,32 +190,22 @@ def create_pitch_deck(messages):
         "- bullet point 2\n\n"
         "Slide titles: Problem, Solution, Market, Business Model, Go-to-Market Plan, Technology, Roadmap, Team.\n\n"
         "Conversation:\n"
-    ) + "\n".join([f"{m['sender']}: {m['text']}" for m in messages])
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
-    }
+    )
     try:
-        response = requests.post(GEMINI_API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        print("[DEBUG] Gemini API response:", data)
-        return data['candidates'][0]['content']['parts'][0]['text'] if data.get('candidates') else "No pitch deck returned."
+        return _generate_text(template, messages, "No pitch deck returned.", session_id, 'pitch_deck')
     except Exception as e:
         import traceback
         print("[ERROR] Gemini API call failed:", traceback.format_exc())
         raise
 
 
-def simulate_investor_qa(messages):
+def simulate_investor_qa(messages, session_id=None):
     """
     Simulate a 3-question mock investor Q&A based on the startup plan. Let agents answer as themselves.
     """
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY not set!")
-    prompt = (
+    template = (
         "You are simulating a post-pitch investor Q&A for a startup.\n"
         "Based on the following conversation, generate 3 tough investor questions (one per slide):\n"
         "- How will you defend against bigger competitors?\n"
@@ -124,27 +216,17 @@ def simulate_investor_qa(messages):
         "Q: [question]\nPM: [answer]\nCTO: [answer]\nInvestor: [answer]\n"
         "Use only info from the transcript. If not enough info, have agents answer honestly or admit uncertainty.\n\n"
         "Startup transcript:\n"
-        + "\n".join([f"{m['sender']}: {m['text']}" for m in messages])
     )
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
-    }
-    response = requests.post(GEMINI_API_URL, headers=headers, json=payload)
-    response.raise_for_status()
-    data = response.json()
-    return data['candidates'][0]['content']['parts'][0]['text'] if data.get('candidates') else "No Q&A returned."
+    return _generate_text(template, messages, "No Q&A returned.", session_id, 'qa')
 
 
-def generate_risk_map(messages):
+def generate_risk_map(messages, session_id=None):
     """
     Generate a risk heatmap/dashboard for the startup. Score Tech, Market, and Funding risk 0-10, with 1-2 lines of justification each.
     """
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY not set!")
-    prompt = (
+    template = (
         "Based on the following startup transcript, rate the following risks from 0 (no risk) to 10 (extreme risk):\n"
         "- Tech Risk (CTO):\n"
         "- Market Risk (Marketer):\n"
@@ -155,15 +237,5 @@ def generate_risk_map(messages):
         "Market Risk: [score]/10 - [justification]\n"
         "Funding Risk: [score]/10 - [justification]\n\n"
         "Transcript:\n"
-        + "\n".join([f"{m['sender']}: {m['text']}" for m in messages])
     )
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
-    }
-    response = requests.post(GEMINI_API_URL, headers=headers, json=payload)
-    response.raise_for_status()
-    data = response.json()
-    return data['candidates'][0]['content']['parts'][0]['text'] if data.get('candidates') else "No risk map returned."
+    return _generate_text(template, messages, "No risk map returned.", session_id, 'riskmap')
@@ -0,0 +1,35 @@
+# Concurrent generation of the Outcome artifacts
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+
+from common.tracing import in_context
+from summarizer.gemini import summarize_conversation, create_pitch_deck, simulate_investor_qa, generate_risk_map
+
+# Artifact name -> generator. Names match the keys the Outcome endpoints return.
+ARTIFACTS = {
+    'summary': summarize_conversation,
+    'pitch_deck': create_pitch_deck,
+    'qa': simulate_investor_qa,
+    'riskmap': generate_risk_map,
+}
+
+ARTIFACT_WORKERS = int(os.getenv('ARTIFACT_WORKERS', '8'))
+
+# Shared and bounded so a burst of bundle requests queues instead of spawning threads
+_executor = ThreadPoolExecutor(max_workers=ARTIFACT_WORKERS, thread_name_prefix='artifacts')
+
+
+def generate_artifacts(messages, names=None, session_id=None):
+    """
+    Fans the requested artifacts out on the shared executor and yields
+    (name, result, error) tuples in completion order, so the whole bundle
+    takes about as long as the slowest Gemini call.
+    """
+    names = [n for n in (names or ARTIFACTS) if n in ARTIFACTS]
+    futures = {_executor.submit(in_context(ARTIFACTS[name]), messages, session_id): name for name in names}
+    for future in as_completed(futures):
+        name = futures[future]
+        try:
+            yield name, future.result(), None
+        except Exception as e:
+            yield name, None, str(e)
@@ -0,0 +1,182 @@
+# Speculative background generation of the Outcome artifacts
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Event, Thread
+import os
+import time
+
+from common.tracing import tracer
+from summarizer.pipeline import ARTIFACTS
+
+PRECOMPUTE_ENABLED = os.getenv('PRECOMPUTE', '1') == '1'
+# A session whose transcript hasn't changed for this long gets its artifacts precomputed
+# (0 = only when /api/complete-session asks for it)
+PRECOMPUTE_QUIET_SECONDS = float(os.getenv('PRECOMPUTE_QUIET_SECONDS', '20'))
+# Kept small so speculative work leaves the Gemini slots to requests users are waiting on
+PRECOMPUTE_WORKERS = int(os.getenv('PRECOMPUTE_WORKERS', '1'))
+
+# Session artifact holding {'version', 'value'} for each precomputed artifact
+ARTIFACT_PREFIX = 'precomputed:'
+
+
+class PrecomputeJob:
+    def __init__(self, session_id, version, names, pinned=False):
+        self.session_id = session_id
+        self.version = version
+        # Pinned jobs were asked for (complete-session) and survive later messages
+        self.pinned = pinned
+        self.remaining = len(names)
+        self.futures = []
+        self._cancel = Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        # Artifacts not started yet are dropped; running Gemini calls finish but aren't stored
+        for future in self.futures:
+            future.cancel()
+
+
+class Precomputer:
+    """
+    Watches session activity and, once a transcript has been quiet for
+    quiet_seconds, generates every Outcome artifact for that transcript
+    version on a small low-priority pool. Results are stored with the
+    session (so every worker sharing the store can serve them) tagged with
+    the version they were made from; the Outcome endpoints serve them only
+    for that exact version. New messages discard an unpinned job.
+
+    A user asking for an artifact that is still being precomputed doesn't
+    pay twice: the identical Gemini request in flight is shared by the
+    governor, and a finished one is in the Gemini cache.
+    """
+
+    def __init__(self, sessions, quiet_seconds=PRECOMPUTE_QUIET_SECONDS, workers=PRECOMPUTE_WORKERS):
+        self.sessions = sessions
+        self.quiet_seconds = quiet_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='precompute')
+        self._activity = {}   # session id -> monotonic time of its last comment
+        self._jobs = {}       # session id -> running PrecomputeJob
+        self._changed = Condition()
+        self._watcher = None
+        self.stats = {'started': 0, 'stored': 0, 'discarded': 0, 'failed': 0, 'served': 0}
+
+    def note_activity(self, session_id):
+        # Called for every comment added to a session
+        if not PRECOMPUTE_ENABLED:
+            return
+        with self._changed:
+            self._activity[session_id] = time.monotonic()
+            job = self._jobs.get(session_id)
+            if job is not None and not job.pinned:
+                job.cancel()
+                del self._jobs[session_id]
+                self.stats['discarded'] += 1
+            self._changed.notify_all()
+
+    def get(self, session, name, version):
+        """The precomputed artifact for the session's transcript as of version, or None."""
+        stored = session.get_artifact(ARTIFACT_PREFIX + name)
+        if stored is None or version is None or stored['version'] != version:
+            return None
+        self.stats['served'] += 1
+        return stored['value']
+
+    def put(self, session, name, version, value):
+        # Also used for artifacts an endpoint generated anyway (e.g. the complete-session summary)
+        session.set_artifact(ARTIFACT_PREFIX + name, {'version': version, 'value': value})
+
+    def schedule(self, session, version=None, names=None, pinned=False):
+        """
+        Starts generating the named artifacts (default: all) for the
+        transcript as of version (default: latest), skipping those already
+        stored for it. Returns the job, or None when there's nothing to do.
+        """
+        if not PRECOMPUTE_ENABLED:
+            return None
+        transcript = session.transcript
+        version = transcript.version if version is None else version
+        if not version or not len(transcript):
+            return None
+        names = [n for n in (names or ARTIFACTS) if n in ARTIFACTS and self._stored_version(session, n) != version]
+        if not names:
+            return None
+        with self._changed:
+            job = self._jobs.get(session.id)
+            if job is not None and job.version == version and not job.cancelled:
+                job.pinned = job.pinned or pinned
+                return job
+            if job is not None:
+                job.cancel()
+            job = self._jobs[session.id] = PrecomputeJob(session.id, version, names, pinned)
+            job.futures = [self._executor.submit(self._run, job, session, name) for name in names]
+            self.stats['started'] += 1
+            return job
+
+    def _stored_version(self, session, name):
+        stored = session.get_artifact(ARTIFACT_PREFIX + name)
+        return stored['version'] if stored is not None else None
+
+    def _run(self, job, session, name):
+        try:
+            if job.cancelled:
+                return
+            transcript = session.transcript
+            if transcript.version != job.version and not job.pinned:
+                # Messages arrived through another worker process
+                self._discard(job)
+                return
+            messages = transcript if transcript.version == job.version else session.messages(job.version)
+            with tracer.span('precompute', root=True, artifact=name, session_id=session.id, version=job.version):
+                try:
+                    value = ARTIFACTS[name](messages, session.id)
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    print(f"[WARN] Precomputing {name} for session {session.id} failed: {e}")
+                    return
+            if job.cancelled:
+                return
+            self.put(session, name, job.version, value)
+            self.stats['stored'] += 1
+        finally:
+            with self._changed:
+                job.remaining -= 1
+                if job.remaining <= 0 and self._jobs.get(job.session_id) is job:
+                    del self._jobs[job.session_id]
+
+    def _discard(self, job):
+        with self._changed:
+            if not job.cancelled:
+                job.cancel()
+                self.stats['discarded'] += 1
+
+    def start(self):
+        # Starts the quiet-transcript watcher (idempotent)
+        if not PRECOMPUTE_ENABLED or self.quiet_seconds <= 0 or self._watcher is not None:
+            return
+        with self._changed:
+            if self._watcher is None:
+                self._watcher = Thread(target=self._watch, name='precompute-watch', daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        while True:
+            with self._changed:
+                now = time.monotonic()
+                quiet = [sid for sid, last in self._activity.items() if now - last >= self.quiet_seconds]
+                for session_id in quiet:
+                    del self._activity[session_id]
+                if not quiet:
+                    # Sleep until the oldest active session could have gone quiet
+                    oldest = min(self._activity.values(), default=None)
+                    self._changed.wait(None if oldest is None else oldest + self.quiet_seconds - now)
+                    continue
+            for session_id in quiet:
+                try:
+                    session = self.sessions.get(session_id)
+                    if session is not None:
+                        self.schedule(session)
+                except Exception as e:
+                    print(f"[WARN] Could not schedule precompute for session {session_id}: {e}")
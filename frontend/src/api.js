@@ -19,41 +19,89 @@ export async function sendAgentMessage({ sender, recipient, text }) {
   return res.json();
 }
 
-export async function completeSession({ sessionId, messages }) {
+// /api/agent-message answers with a job id; replies are read back from the job
+export async function fetchAgentMessageJob(jobId, since = 0) {
+  const res = await fetch(`${API_BASE}/api/agent-message/${jobId}?since=${since}`);
+  if (!res.ok) throw new Error('Failed to fetch roundtable job');
+  return res.json();
+}
+
+export async function cancelAgentMessageJob(jobId) {
+  const res = await fetch(`${API_BASE}/api/agent-message/${jobId}/cancel`, { method: 'POST' });
+  return res.json();
+}
+
+// Outcome calls only name the session: the server already has the transcript.
+// version is the feed cursor the user had reached, so later agent chatter is ignored.
+export async function completeSession({ sessionId, version }) {
   const res = await fetch(`${API_BASE}/api/complete-session`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ session_id: sessionId, messages })
+    body: JSON.stringify({ session_id: sessionId, version })
   });
   return res.json();
 }
 
-export async function fetchConversationFeed() {
-  const res = await fetch(`${API_BASE}/api/conversation-feed`);
+export async function fetchConversationFeed(sessionId, since = 0) {
+  const res = await fetch(`${API_BASE}/api/conversation-feed?session_id=${sessionId}&since=${since}`);
   if (!res.ok) throw new Error('Failed to fetch conversation feed');
   return res.json();
 }
 
-export async function startRoundtable(message) {
+// Opens a Server-Sent Events stream of new comments. The browser resumes
+// from the last received id on its own when the connection drops.
+export function openConversationStream(sessionId, since, onComment) {
+  const source = new EventSource(`${API_BASE}/api/conversation-stream?session_id=${sessionId}&since=${since}`);
+  source.addEventListener('comment', (event) => {
+    onComment(JSON.parse(event.data));
+  });
+  return source;
+}
+
+// mode: 'chain' (agents reply to each other in turn) or 'panel' (all at once, then a synthesis)
+// roster: the session's [{ role, personality }]; the agent runtime remembers it per session
+export async function startRoundtable(message, sessionId, mode = 'chain', roster = []) {
   const res = await fetch(`http://127.0.0.1:8000/start_roundtable`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ message: message })
+    body: JSON.stringify({ message: message, session_id: sessionId || '', mode, roster })
   });
   if (!res.ok) throw new Error('Failed to start roundtable');
   return res.json();
 }
 
-export async function fetchPitchDeck(messages) {
+export async function fetchPitchDeck(sessionId, version) {
   const res = await fetch(`${API_BASE}/api/pitch-deck`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ messages })
+    body: JSON.stringify({ session_id: sessionId, version })
   });
   if (!res.ok) throw new Error('Failed to fetch pitch deck');
   return res.json();
 }
 
+// Requests several Outcome artifacts at once. Each one is handed to onArtifact
+// as soon as the server finishes it (NDJSON stream), instead of one call each.
+export async function fetchOutcomeBundle({ sessionId, version, artifacts }, onArtifact) {
+  const res = await fetch(`${API_BASE}/api/outcome-bundle`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ session_id: sessionId, version, artifacts, stream: true })
+  });
+  if (!res.ok) throw new Error('Failed to fetch outcome bundle');
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    lines.filter(Boolean).forEach((line) => onArtifact(JSON.parse(line)));
+  }
+}
+
 export async function simulateConflict({ sessionId, idea }) {
   const res = await fetch(`${API_BASE}/api/simulate-conflict`, {
     method: 'POST',
@@ -81,20 +129,20 @@ export async function fetchMoodboard({ idea, messages }) {
   return res.json();
 }
 
-export async function fetchInvestorQA(messages) {
+export async function fetchInvestorQA(sessionId, version) {
   const res = await fetch(`${API_BASE}/api/investor-qa`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ messages })
+    body: JSON.stringify({ session_id: sessionId, version })
   });
   return res.json();
 }
 
-export async function fetchRiskMap(messages) {
+export async function fetchRiskMap(sessionId, version) {
   const res = await fetch(`${API_BASE}/api/risk-map`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ messages })
+    body: JSON.stringify({ session_id: sessionId, version })
   });
   return res.json();
 }
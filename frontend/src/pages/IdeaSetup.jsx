@@ -158,7 +158,7 @@ export default function IdeaSetup({ onStart }) {
           agents: res.agents,
           sessionId: res.session_id,
         });
-        await startRoundtable(idea);
+        await startRoundtable(idea, res.session_id, "chain", res.agents);
       } else {
         setError("Failed to start session.");
       }
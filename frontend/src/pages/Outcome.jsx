@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import ReportSummary from '../components/ReportSummary';
 import PitchDeckViewer from '../components/PitchDeckViewer';
 import ConflictDialog from '../components/ConflictDialog';
@@ -6,7 +6,7 @@ import InvestorQADialog from '../components/InvestorQADialog';
 import RiskMapDialog from '../components/RiskMapDialog';
 import AgentProfileCard from '../components/AgentProfileCard';
 import Confetti from '../components/Confetti';
-import { fetchPitchDeck, simulateConflict, resolveConflict, fetchInvestorQA, fetchRiskMap } from '../api';
+import { fetchPitchDeck, simulateConflict, resolveConflict, fetchInvestorQA, fetchRiskMap, fetchOutcomeBundle } from '../api';
 
 export default function Outcome({ report, onRestart }) {
   const [pitchDeck, setPitchDeck] = useState(null);
@@ -24,14 +24,35 @@ export default function Outcome({ report, onRestart }) {
   // Extract these from report for API calls
   const sessionId = report?.session_id || report?.sessionId;
   const idea = report?.idea;
-  const messages = report?.messages;
+  const version = report?.version;
+
+  // Generate all remaining artifacts in one concurrent request as soon as the
+  // page opens. Each artifact gets its own promise, resolved the moment its
+  // line arrives, so a button only waits for its own artifact.
+  const prefetched = useRef({});
+  useEffect(() => {
+    if (!sessionId) return;
+    const names = ['pitch_deck', 'qa', 'riskmap'];
+    const resolvers = {};
+    prefetched.current = Object.fromEntries(
+      names.map((name) => [name, new Promise((resolve) => { resolvers[name] = resolve; })])
+    );
+    fetchOutcomeBundle({ sessionId, version, artifacts: names }, (result) => {
+      resolvers[result.artifact]?.(result.error ? undefined : result.value);
+    })
+      .catch(() => {})
+      // Artifacts the bundle didn't deliver fall back to their own endpoint
+      .finally(() => names.forEach((name) => resolvers[name](undefined)));
+  }, [sessionId, version]);
+
+  const fromBundle = async (name) => prefetched.current[name];
 
   const handlePitchDeck = async () => {
     setLoading(true);
     setError('');
     try {
-      const res = await fetchPitchDeck(messages);
-      setPitchDeck(res.pitch_deck);
+      const deck = await fromBundle('pitch_deck');
+      setPitchDeck(deck ?? (await fetchPitchDeck(sessionId, version)).pitch_deck);
     } catch (e) {
       setError('Could not generate pitch deck.');
     }
@@ -66,8 +87,8 @@ export default function Outcome({ report, onRestart }) {
     setQALoading(true);
     setError('');
     try {
-      const res = await fetchInvestorQA(messages);
-      setQA(res.qa);
+      const qa = await fromBundle('qa');
+      setQA(qa ?? (await fetchInvestorQA(sessionId, version)).qa);
     } catch (e) {
       setError('Could not generate investor Q&A.');
     }
@@ -78,8 +99,8 @@ export default function Outcome({ report, onRestart }) {
     setRiskmapLoading(true);
     setError('');
     try {
-      const res = await fetchRiskMap(messages);
-      setRiskmap(res.riskmap);
+      const riskmap = await fromBundle('riskmap');
+      setRiskmap(riskmap ?? (await fetchRiskMap(sessionId, version)).riskmap);
     } catch (e) {
       setError('Could not generate risk map.');
     }
@@ -5,6 +5,7 @@ import {
   sendAgentMessage,
   completeSession,
   fetchConversationFeed,
+  openConversationStream,
   startRoundtable,
 } from "../api";
 import { useRef } from "react";
@@ -15,6 +16,7 @@ export default function Simulation({ session, onOutcome }) {
       agent: "User",
       sender: "User",
       message: message,
+      session_id: session.sessionId,
     };
 
     const BACKEND_URL = "http://127.0.0.1:5000/api/agent-comment";
@@ -35,12 +37,48 @@ export default function Simulation({ session, onOutcome }) {
   const [showTooltip, setShowTooltip] = useState(false);
   const intervalRef = useRef(null);
 
+  // Streamed replies arrive as partial deltas sharing a stream_id, then a final
+  // comment with the full text; fold them into a single chat bubble.
+  const mergeComments = (msgs, comments) => {
+    const merged = [...msgs];
+    for (const c of comments) {
+      const idx = c.stream_id
+        ? merged.findIndex((m) => m.streamId === c.stream_id)
+        : -1;
+      if (idx === -1) {
+        merged.push({ sender: c.agent, text: c.message, streamId: c.stream_id });
+      } else {
+        const text = c.partial ? merged[idx].text + c.message : c.message;
+        merged[idx] = { ...merged[idx], text };
+      }
+    }
+    return merged;
+  };
+  const cursorRef = useRef(0);
+
+  const sessionId = session?.sessionId;
+
   useEffect(() => {
+    if (!sessionId) return;
+    // Prefer the push stream; fall back to cursor polling where EventSource is missing
+    if (window.EventSource) {
+      const source = openConversationStream(sessionId, cursorRef.current, (c) => {
+        const isFirst = cursorRef.current === 0;
+        cursorRef.current = c.seq;
+        setMessages((msgs) => mergeComments(isFirst ? [] : msgs, [c]));
+      });
+      return () => source.close();
+    }
+
     intervalRef.current = setInterval(async () => {
       try {
-        const feed = await fetchConversationFeed();
-        setMessages(
-          feed.comments.map((c) => ({ sender: c.agent, text: c.message }))
+        // Only ask for comments newer than the last cursor we saw
+        const feed = await fetchConversationFeed(sessionId, cursorRef.current);
+        const isFirstPage = cursorRef.current === 0;
+        cursorRef.current = feed.cursor;
+        if (!feed.comments.length) return;
+        setMessages((msgs) =>
+          mergeComments(isFirstPage ? [] : msgs, feed.comments)
         );
       } catch (e) {
         // ignore fetch errors
@@ -53,7 +91,7 @@ export default function Simulation({ session, onOutcome }) {
         clearInterval(intervalRef.current);
       }
     };
-  }, []);
+  }, [sessionId]);
 
   useEffect(() => {
     if (showTooltip) {
@@ -87,7 +125,7 @@ export default function Simulation({ session, onOutcome }) {
     try {
       await postUser(input);
       // setMessages((msgs) => [...msgs, { sender: "User", text: input }]);
-      await startRoundtable(input);
+      await startRoundtable(input, session.sessionId);
       setShowTooltip(true);
     } catch (e) {
       setError("Server error. Please try again.");
@@ -104,9 +142,9 @@ export default function Simulation({ session, onOutcome }) {
     try {
       const res = await completeSession({
         sessionId: session.sessionId,
-        messages,
+        version: cursorRef.current || undefined,
       });
-      onOutcome({ ...res, messages });
+      onOutcome({ ...res, session_id: session.sessionId });
     } catch (e) {
       setError("Could not complete session. Please try again.");
     } finally {